@@ -0,0 +1,119 @@
+"""
+記事本文の永続キャッシュ（正規化URL単位）
+
+同じ記事は日をまたいで、また別のRSSキーワードからも繰り返し取得されるため、
+抽出済みの本文・取得時刻・HTTPの検証子（ETag / Last-Modified）を output/cache/articles.json に保存する。
+
+- ARTICLE_CACHE_FRESH 以内: ネットワークに出ずにキャッシュの本文を返す
+- それ以降: If-None-Match / If-Modified-Since 付きで再取得し、304なら本文を使い回す
+- ARTICLE_CACHE_MAX_AGE を過ぎたエントリは読み込み時に削除する
+"""
+
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.local_store import JsonStore
+
+ARTICLE_CACHE_FRESH = 12 * 3600  # 再検証なしで使う期間（秒）
+ARTICLE_CACHE_MAX_AGE = 14 * 86400  # これより古いエントリは削除（秒）
+
+# 記事の中身に関係しないトラッキング用クエリパラメータ
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "ref", "ref_src", "from", "cmpid", "ncid", "mc_cid", "mc_eid"}
+
+
+def canonical_url(url):
+    """キャッシュ・重複判定用の正規化URL
+
+    スキーム・ホストの小文字化、既定ポート・フラグメント・トラッキング用パラメータ（utm_*等）の除去、
+    クエリの並べ替え、末尾スラッシュの除去を行う。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class ArticleCache:
+    """正規化URL → {本文, 取得時刻, 検証子} の永続キャッシュ"""
+
+    def __init__(self, store=None):
+        self.store = store or JsonStore("articles.json")
+        self._evict()
+
+    def _evict(self):
+        now = time.time()
+        with self.store.lock:
+            data = self.store.data
+            expired = [k for k, v in data.items() if now - v.get("fetched_at", 0) > ARTICLE_CACHE_MAX_AGE]
+            for key in expired:
+                del data[key]
+            if expired:
+                print(f"[CACHE] 記事キャッシュ: 期限切れ{len(expired)}件を削除")
+                self.store.save()
+
+    def get(self, url, max_chars=None):
+        """キャッシュ済みエントリを返す（max_chars分の本文を持っていなければ None）"""
+        with self.store.lock:
+            entry = self.store.data.get(canonical_url(url))
+        if not entry:
+            return None
+        if max_chars is not None and entry["max_chars"] < max_chars and len(entry["body"]) >= entry["max_chars"]:
+            return None  # 以前はもっと短く切り詰めて保存した
+        return entry
+
+    @staticmethod
+    def is_fresh(entry):
+        return time.time() - entry["fetched_at"] < ARTICLE_CACHE_FRESH
+
+    @staticmethod
+    def conditional_headers(entry):
+        """条件付きGET用ヘッダー"""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, body, max_chars, response_headers):
+        """抽出した本文と検証子を保存する"""
+        with self.store.lock:
+            self.store.data[canonical_url(url)] = {
+                "url": url,
+                "body": body,
+                "max_chars": max_chars,
+                "fetched_at": time.time(),
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified"),
+            }
+            self.store.save()
+
+    def touch(self, url):
+        """304（未変更）を受けたエントリの取得時刻を更新する"""
+        with self.store.lock:
+            entry = self.store.data.get(canonical_url(url))
+            if entry:
+                entry["fetched_at"] = time.time()
+                self.store.save()
+
+
+_article_cache = None
+_article_cache_lock = threading.Lock()
+
+
+def get_article_cache():
+    """プロセス共通の ArticleCache（初回のみ読み込み）"""
+    global _article_cache
+    with _article_cache_lock:
+        if _article_cache is None:
+            _article_cache = ArticleCache()
+    return _article_cache
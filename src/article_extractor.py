@@ -0,0 +1,150 @@
+"""
+記事本文のストリーミング抽出
+
+HTMLをチャンク単位で受け取り、標準ライブラリの HTMLParser（イベント駆動）で逐次解析する。
+DOMツリーは作らず、<p> のテキストが max_chars に達した時点で解析をやめるため、
+重いニュースページでも残りのHTMLのダウンロード・解析をしない。
+
+抽出ルールは従来の BeautifulSoup 版と同じ:
+- script / style / nav / header / footer / aside / iframe / noscript の中身は無視
+- <article> があれば（最初の）その中の <p>、なければページ全体の <p> を使う
+- 10文字未満の <p>（ボタンラベル等）はスキップ
+ただし途中で打ち切るため、<article> より前に <p> だけで max_chars に達したページでは
+ページ全体の <p> を採用する。
+"""
+
+import codecs
+import re
+from html.parser import HTMLParser
+
+SKIP_TAGS = {"script", "style", "nav", "header", "footer", "aside", "iframe", "noscript"}
+MIN_PARAGRAPH_CHARS = 10
+CHARSET_SNIFF_BYTES = 4096
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_\-]+)""", re.IGNORECASE)
+
+
+class ArticleTextParser(HTMLParser):
+    """<p> のテキストを集めるイベント駆動パーサー（done になったら以降の入力は不要）"""
+
+    def __init__(self, max_chars=2000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.article_paragraphs = []  # <article> 内の <p>
+        self.page_paragraphs = []  # ページ全体の <p>
+        self.article_chars = 0
+        self.page_chars = 0
+        self.seen_article = False
+        self.done = False
+        self._skip_depth = 0
+        self._article_depth = 0
+        self._in_p = False
+        self._p_in_article = False
+        self._p_parts = []  # 現在の <p> 内のテキストノード
+        self._node = []  # 現在のテキストノード（チャンク境界で分割されたもの）
+
+    def _flush_node(self):
+        if self._node:
+            if self._in_p:
+                text = "".join(self._node).strip()
+                if text:
+                    self._p_parts.append(text)
+            self._node = []
+
+    def _close_p(self):
+        self._flush_node()
+        if not self._in_p:
+            return
+        text = "".join(self._p_parts)
+        self._in_p = False
+        self._p_parts = []
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            return
+        if self._p_in_article and self.article_chars < self.max_chars:
+            self.article_paragraphs.append(text)
+            self.article_chars += len(text)
+        if self.page_chars < self.max_chars:
+            self.page_paragraphs.append(text)
+            self.page_chars += len(text)
+        # <article> 内で十分集まった / <article> が現れないまま十分集まった → 終了
+        if self.article_chars >= self.max_chars or (not self.seen_article and self.page_chars >= self.max_chars):
+            self.done = True
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_node()
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "article":
+            self.seen_article = True
+            self._article_depth += 1
+        elif tag == "p" and not self._skip_depth:
+            self._close_p()  # <p> の中の <p> は前の段落を閉じる（HTMLの暗黙の終了）
+            self._in_p = True
+            self._p_in_article = self._article_depth > 0
+
+    def handle_endtag(self, tag):
+        self._flush_node()
+        if tag in SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag == "article":
+            if self._article_depth:
+                self._article_depth -= 1
+                # 最初の <article> を読み終えた時点で段落があれば、それを本文とする
+                if not self._article_depth and self.article_paragraphs:
+                    self.done = True
+        elif tag == "p":
+            self._close_p()
+
+    def handle_data(self, data):
+        if self._in_p and not self._skip_depth:
+            self._node.append(data)
+
+    def result(self):
+        """抽出した本文（<article> があればその中の段落を優先）"""
+        self._close_p()
+        paragraphs = self.article_paragraphs if self.article_paragraphs else self.page_paragraphs
+        return "\n".join(paragraphs)
+
+
+def sniff_charset(head, declared=None):
+    """文字コードを決める（Content-Typeの指定 > <meta charset> > UTF-8）"""
+    for name in (declared, _meta_charset(head)):
+        if name:
+            try:
+                return codecs.lookup(name).name
+            except LookupError:
+                continue
+    return "utf-8"
+
+
+def _meta_charset(head):
+    match = _META_CHARSET_RE.search(head[:CHARSET_SNIFF_BYTES])
+    return match.group(1).decode("ascii") if match else None
+
+
+def extract_article_text(chunks, declared_charset=None, max_chars=2000):
+    """HTMLのチャンク列から本文を抽出する（max_chars に達したら残りのチャンクは読まない）
+
+    Returns:
+        (本文, 途中で打ち切ったか)
+    """
+    parser = ArticleTextParser(max_chars=max_chars)
+    decoder = None
+    head = b""
+    for chunk in chunks:
+        if decoder is None:
+            # 文字コード判定用に先頭を貯める
+            head += chunk
+            if len(head) < CHARSET_SNIFF_BYTES:
+                continue
+            decoder = codecs.getincrementaldecoder(sniff_charset(head, declared_charset))(errors="replace")
+            chunk, head = head, b""
+        parser.feed(decoder.decode(chunk))
+        if parser.done:
+            return parser.result()[:max_chars], True
+    if decoder is None:
+        decoder = codecs.getincrementaldecoder(sniff_charset(head, declared_charset))(errors="replace")
+        parser.feed(decoder.decode(head))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser.result()[:max_chars], parser.done
@@ -0,0 +1,115 @@
+"""
+取得した動画・記事のタイトル類似クラスタリングとランク付け
+
+転載・再投稿・配信先違いの同一記事など、タイトルがほぼ同じ候補が
+max_videos / max_articles の枠を埋めて要約のトークンを無駄にしないよう、
+文字n-gramの類似度（SimilarityIndex）でクラスタにまとめ、クラスタごとに代表1件だけを残す。
+代表は「新しさ」と「反応（コメント数・再生数 / 記事なら掲載媒体数）」を合成したスコアで選び、並べる。
+"""
+
+import math
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from src.feed_fetcher import normalize_title
+from src.similarity_index import SimilarityIndex
+
+TITLE_SIMILARITY_THRESHOLD = 0.6
+FRESHNESS_WEIGHT = 0.4
+ENGAGEMENT_WEIGHT = 0.6
+VIDEO_HALF_LIFE_HOURS = 72  # この時間で新しさスコアが半分になる
+ARTICLE_HALF_LIFE_HOURS = 48
+
+
+def parse_published(value):
+    """ISO 8601（YouTube）/ RFC 822（RSS）の公開日時をdatetimeに（解釈できなければ None）"""
+    if not value:
+        return None
+    try:
+        published = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            published = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published
+
+
+def freshness(published, half_life_hours, now=None):
+    """新しさ（0〜1。公開直後が1で half_life_hours ごとに半減。日時不明は0.5）"""
+    published = parse_published(published)
+    if published is None:
+        return 0.5
+    now = now or datetime.now(timezone.utc)
+    age_hours = max(0.0, (now - published).total_seconds() / 3600)
+    return 0.5 ** (age_hours / half_life_hours)
+
+
+def cluster_by_title(items, threshold=TITLE_SIMILARITY_THRESHOLD):
+    """タイトルが類似する候補をクラスタにまとめる（出現順を保つ）
+
+    Returns:
+        [[item, ...], ...]
+    """
+    index = SimilarityIndex(threshold=threshold)
+    clusters = []
+    for item in items:
+        key = normalize_title(item.get("title", ""), item.get("source", ""))
+        match = index.find_similar(key) if key else None
+        if match:
+            clusters[match[0]].append(item)
+        else:
+            clusters.append([item])
+            if key:
+                index.add(key, len(clusters) - 1)
+    return clusters
+
+
+def _log_normalized(values):
+    """log1pで圧縮して最大値で割る（0〜1）"""
+    logs = [math.log1p(max(0, v)) for v in values]
+    top = max(logs, default=0)
+    return [v / top if top else 0.0 for v in logs]
+
+
+def _rank(clusters, engagement, half_life_hours, label):
+    now = datetime.now(timezone.utc)
+    scored = []
+    for cluster, eng in zip(clusters, engagement):
+        for item, item_eng in zip(cluster, eng):
+            item["score"] = round(
+                FRESHNESS_WEIGHT * freshness(item.get("published"), half_life_hours, now)
+                + ENGAGEMENT_WEIGHT * item_eng,
+                4,
+            )
+        representative = dict(max(cluster, key=lambda x: x["score"]))
+        representative["cluster_size"] = len(cluster)
+        if len(cluster) > 1:
+            print(f"  [DEDUPE] {label}類似{len(cluster)}件→1件: {representative.get('title', '')[:40]}...")
+        scored.append(representative)
+    scored.sort(key=lambda x: x["score"], reverse=True)
+    return scored
+
+
+def rank_videos(videos, threshold=TITLE_SIMILARITY_THRESHOLD):
+    """動画をタイトル類似でまとめ、新しさ+反応（コメント数重視・再生数）のスコア順に返す"""
+    if not videos:
+        return []
+    clusters = cluster_by_title(videos, threshold)
+    comments = _log_normalized([v.get("comments_count", 0) for v in videos])
+    views = _log_normalized([v.get("views_count", 0) for v in videos])
+    per_video = {id(v): 0.7 * c + 0.3 * w for v, c, w in zip(videos, comments, views)}
+    engagement = [[per_video[id(v)] for v in cluster] for cluster in clusters]
+    return _rank(clusters, engagement, VIDEO_HALF_LIFE_HOURS, "動画")
+
+
+def rank_articles(articles, threshold=TITLE_SIMILARITY_THRESHOLD):
+    """記事をタイトル類似でまとめ、新しさ+掲載媒体数（クラスタの大きさ）のスコア順に返す"""
+    if not articles:
+        return []
+    clusters = cluster_by_title(articles, threshold)
+    coverage = _log_normalized([len(c) for c in clusters])
+    engagement = [[cov] * len(cluster) for cluster, cov in zip(clusters, coverage)]
+    return _rank(clusters, engagement, ARTICLE_HALF_LIFE_HOURS, "記事")
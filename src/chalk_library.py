@@ -0,0 +1,127 @@
+"""
+チョーク風イラストのローカルライブラリ（プロンプトのハッシュ単位で生成画像を貯めて使い回す）
+
+generate_chalk_illustration のプロンプトはテーマ別の数種類しかないため、
+生成済み画像を output/cache/chalk_library/{プロンプトハッシュ}/ に保存しておき、
+毎回の実行ではその中から順番に（ローテーションで）1枚選んでコピーするだけにする。
+ライブラリから使えた（＝前回までの実行の画像が残っている）のに在庫が MIN_POOL_SIZE 枚未満なら、
+バックグラウンドのスレッドで1枚ずつ補充する（画像生成APIの待ち時間がパイプラインの本流に乗らない）。
+在庫が0枚のプロンプトはその場で1枚だけ生成し、補充はしない
+（保存先が実行ごとに消える環境で、使われない画像の生成に課金しないため）。
+GitHub Actions では output/cache ごと actions/cache で引き継ぐ。
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+from PIL import Image
+
+from src.local_store import CACHE_DIR, JsonStore
+
+LIBRARY_DIR = os.path.join(CACHE_DIR, "chalk_library")
+MIN_POOL_SIZE = 4  # プロンプトごとにこの枚数まで貯める（未満なら補充）
+REFILL_WAIT_SECONDS = 60  # 終了時に補充の完了を待つ最大秒数
+
+
+def prompt_key(prompt):
+    """プロンプト本文のハッシュ（ライブラリのキー）"""
+    return hashlib.sha256(prompt.strip().encode("utf-8")).hexdigest()[:16]
+
+
+class ChalkLibrary:
+    """プロンプト別の生成画像プール
+
+    Args:
+        generate: プロンプトを受け取り PIL Image（失敗時 None）を返す関数
+        size: 保存・出力する画像サイズ
+    """
+
+    def __init__(self, generate, size=(640, 360), library_dir=LIBRARY_DIR):
+        self.generate = generate
+        self.size = size
+        self.library_dir = library_dir
+        self.cursors = JsonStore("chalk_library.json")  # プロンプトハッシュ -> 次に使う番号
+        self._refilling = {}  # プロンプトハッシュ -> 補充スレッド
+        self._lock = threading.Lock()
+
+    def images(self, key):
+        return sorted(glob.glob(os.path.join(self.library_dir, key, "*.png")))
+
+    def _generate_into_pool(self, prompt, key):
+        """1枚生成してプールに追加する（失敗時 None）"""
+        img = self.generate(prompt)
+        if img is None:
+            return None
+        pool_dir = os.path.join(self.library_dir, key)
+        os.makedirs(pool_dir, exist_ok=True)
+        existing = self.images(key)
+        last = int(os.path.splitext(os.path.basename(existing[-1]))[0]) if existing else 0
+        path = os.path.join(pool_dir, f"{last + 1:03d}.png")
+        tmp_path = f"{path}.tmp"
+        img.convert("RGB").resize(self.size, Image.LANCZOS).save(tmp_path, format="PNG")
+        os.replace(tmp_path, path)
+        return path
+
+    def _refill(self, prompt, key):
+        try:
+            path = self._generate_into_pool(prompt, key)
+            if path:
+                print(f"  [CACHE] チョーク画像ライブラリ補充: {path}（在庫{len(self.images(key))}枚）")
+        except Exception as e:
+            print(f"  [WARN] チョーク画像ライブラリ補充失敗: {e}")
+        finally:
+            with self._lock:
+                self._refilling.pop(key, None)
+
+    def _start_refill(self, prompt, key):
+        """在庫補充をバックグラウンドで開始（同じプロンプトは同時に1本まで）"""
+        with self._lock:
+            if key in self._refilling:
+                return
+            thread = threading.Thread(
+                target=self._refill, args=(prompt, key), name=f"chalk-refill-{key}", daemon=True
+            )
+            self._refilling[key] = thread
+        thread.start()
+
+    def wait(self, timeout):
+        """実行中の補充を最大 timeout 秒待つ（プロセス終了前に呼ぶ。間に合わなければ破棄）"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            threads = list(self._refilling.values())
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def take(self, prompt, output_path):
+        """プロンプトに対応する画像を1枚 output_path に書き出す（ライブラリに無ければ生成）
+
+        Returns:
+            output_path。生成もできなければ None
+        """
+        key = prompt_key(prompt)
+        pool = self.images(key)
+        hit = bool(pool)
+        if not hit:
+            print("  [CACHE] チョーク画像ライブラリ未登録のプロンプト → その場で生成")
+            path = self._generate_into_pool(prompt, key)
+            if not path:
+                return None
+            pool = [path]
+
+        with self.cursors.lock:
+            cursor = self.cursors.data.get(key, 0)
+            chosen = pool[cursor % len(pool)]
+            self.cursors.data[key] = cursor + 1
+            self.cursors.save()
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        shutil.copyfile(chosen, output_path)
+        print(f"  [CACHE] チョーク画像ライブラリから使用: {os.path.basename(chosen)}（在庫{len(pool)}枚）")
+
+        if hit and len(pool) < MIN_POOL_SIZE:
+            self._start_refill(prompt, key)
+        return output_path
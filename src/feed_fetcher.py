@@ -0,0 +1,130 @@
+"""
+RSSフィードの並列取得（条件付きGET + 解析結果キャッシュ）
+
+複数のフィードを共通Session上で同時に取得し、ETag / Last-Modified を output/cache/rss_feeds.json に保存する。
+未変更のフィードは304を1回受けるだけで、feedparserでの解析もしない（前回の解析結果を使う）。
+取得した記事は正規化URL・正規化タイトルの両方で重複を除いてマージする。
+"""
+
+import re
+import time
+import unicodedata
+
+import feedparser
+
+from src.article_cache import canonical_url
+from src.http_client import get_session, run_concurrently
+from src.local_store import JsonStore
+
+FEED_TIMEOUT = (5, 15)  # (connect, read) タイムアウト
+FEED_DEADLINE = 20  # 全フィード取得の締め切り（秒）
+FEED_CACHE_MAX_AGE = 7 * 86400  # これより古いフィードのキャッシュは削除（秒）
+
+_TITLE_NOISE_RE = re.compile(r"[\s\W_]+")
+
+
+def normalize_title(title, source=""):
+    """重複判定用のタイトル（Google Newsが末尾に付ける「 - 媒体名」・空白・記号を除去）"""
+    title = unicodedata.normalize("NFKC", title or "")
+    source = unicodedata.normalize("NFKC", source or "")
+    if source and title.endswith(f" - {source}"):
+        title = title[: -len(source) - 3]
+    return _TITLE_NOISE_RE.sub("", title).lower()
+
+
+class FeedFetcher:
+    """条件付きGETでRSSを取得し、解析結果をキャッシュする"""
+
+    def __init__(self, store=None, session=None):
+        self.store = store or JsonStore("rss_feeds.json")
+        self.session = session or get_session()
+        self._evict()
+
+    def _evict(self):
+        now = time.time()
+        with self.store.lock:
+            data = self.store.data
+            for url in [u for u, v in data.items() if now - v.get("fetched_at", 0) > FEED_CACHE_MAX_AGE]:
+                del data[url]
+
+    def fetch(self, feed_url):
+        """1フィード分の記事リストを返す [{"title", "url", "published", "source"}]"""
+        with self.store.lock:
+            cached = self.store.data.get(feed_url)
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        # requestsでXMLを取得してからfeedparserで解析（SSL問題回避）
+        response = self.session.get(feed_url, timeout=FEED_TIMEOUT, headers=headers)
+        if response.status_code == 304 and cached:
+            with self.store.lock:
+                cached["fetched_at"] = time.time()
+                self.store.save()
+            return cached["entries"], True
+        if response.status_code != 200:
+            raise RuntimeError(f"RSS HTTP {response.status_code}")
+
+        feed = feedparser.parse(response.content)
+        entries = [
+            {
+                "title": entry.get("title", ""),
+                "url": entry.get("link", ""),
+                "published": entry.get("published", ""),
+                "source": entry.get("source", {}).get("title", "") if hasattr(entry, "source") else "",
+            }
+            for entry in feed.entries
+        ]
+        with self.store.lock:
+            self.store.data[feed_url] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+                "entries": entries,
+            }
+            self.store.save()
+        return entries, False
+
+    def fetch_all(self, feeds, deadline=FEED_DEADLINE):
+        """複数フィードを並列取得する
+
+        Args:
+            feeds: {ラベル: フィードURL}（ラベルはログ表示用）
+
+        Returns:
+            {ラベル: 記事リスト}（締め切りまでに取得できなかった・失敗したフィードは含まない）
+        """
+        results = {}
+        fetched = run_concurrently(
+            lambda label: self.fetch(feeds[label]),
+            list(feeds),
+            max_workers=len(feeds),
+            deadline=deadline,
+            label="RSS取得",
+        )
+        for label, (entries, not_modified) in fetched:
+            status = "未変更(304)" if not_modified else "取得"
+            print(f"[RSS] 「{label}」{status}: {len(entries)}件")
+            results[label] = entries
+        return results
+
+
+def merge_feed_entries(entry_lists, max_articles=None):
+    """記事リストを順にマージし、正規化URL・正規化タイトルのどちらかが同じ記事を除く"""
+    merged = []
+    seen_urls = set()
+    seen_titles = set()
+    for entries in entry_lists:
+        for entry in entries:
+            if max_articles is not None and len(merged) >= max_articles:
+                return merged
+            url_key = canonical_url(entry["url"]) if entry["url"] else ""
+            title_key = normalize_title(entry["title"], entry.get("source", ""))
+            if (url_key and url_key in seen_urls) or (title_key and title_key in seen_titles):
+                continue
+            seen_urls.add(url_key)
+            seen_titles.add(title_key)
+            merged.append(dict(entry))
+    return merged
@@ -0,0 +1,111 @@
+"""
+フォントレジストリ（Pillow描画共通）
+
+ImageFont.truetype() はCJKフォント（数MB〜十数MB）を呼ぶたびに読み込み・解析するため、
+(パス, サイズ) 単位のLRUで FreeTypeFont を使い回す。
+文字列の描画幅・外接矩形も (パス, サイズ, 文字列) 単位でメモ化する
+（サムネイルのフォントサイズ探索などで同じ文字列を何度も測るため）。
+"""
+
+import os
+from functools import lru_cache
+
+from PIL import ImageFont
+
+FONT_CACHE_SIZE = 64  # 保持する (パス, サイズ) の組数
+TEXT_METRICS_CACHE_SIZE = 4096
+
+
+def get_font(path, size):
+    """(パス, サイズ) の FreeTypeFont を返す（2回目以降はキャッシュから）"""
+    return _load_font(os.path.abspath(path), int(size))
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _load_font(path, size):
+    return ImageFont.truetype(path, size)
+
+
+def _font_key(font):
+    path = getattr(font, "path", None)
+    if isinstance(path, str):
+        return path, font.size
+    return None  # レジストリ外のフォント（load_default等）はメモ化しない
+
+
+def text_width(font, text):
+    """文字列の描画幅（ImageDraw.textlength 相当）"""
+    key = _font_key(font)
+    if key is None:
+        return font.getlength(text)
+    return _text_width(*key, text)
+
+
+def text_bbox(font, text):
+    """文字列の外接矩形 (left, top, right, bottom)"""
+    key = _font_key(font)
+    if key is None:
+        return font.getbbox(text)
+    return _text_bbox(*key, text)
+
+
+@lru_cache(maxsize=TEXT_METRICS_CACHE_SIZE)
+def _text_width(path, size, text):
+    return _load_font(path, size).getlength(text)
+
+
+@lru_cache(maxsize=TEXT_METRICS_CACHE_SIZE)
+def _text_bbox(path, size, text):
+    return _load_font(path, size).getbbox(text)
+
+
+def fit_font(path, text, max_width, start_size, min_size=20, step=2):
+    """max_width に収まる最大のフォントサイズを探す（start_size から step 刻み）
+
+    描画幅はフォントサイズにほぼ比例するため、start_size で1回測った幅から候補サイズを予測し、
+    予測サイズとその1段上を測って確定する。予測が外れた場合だけ、その区間を二分探索する。
+    結果は start_size から1段ずつ下げて探す方法と同じ（幅がサイズに対して単調な限り）。
+
+    Returns:
+        (FreeTypeFont, サイズ)。min_size より大きいサイズで収まらなければ min_size
+    """
+    sizes = list(range(start_size, min_size, -step))
+    probes = {}
+
+    def fits(k):
+        if k not in probes:
+            left, _, right, _ = text_bbox(get_font(path, sizes[k]), text)
+            probes[k] = right - left <= max_width
+        return probes[k]
+
+    if not sizes or not text:
+        size = sizes[0] if sizes else min_size
+        return get_font(path, size), size
+    if fits(0):
+        return get_font(path, sizes[0]), sizes[0]
+
+    # 1回の計測から比例で予測
+    left, _, right, _ = text_bbox(get_font(path, sizes[0]), text)
+    predicted = sizes[0] * max_width / max(1, right - left)
+    k = min(len(sizes) - 1, max(1, int((sizes[0] - predicted + step - 1) // step)))
+
+    # fail_k: 収まらないと分かっている最大の添字 / fit_k: 収まると分かっている最小の添字
+    fail_k, fit_k = 0, len(sizes)
+    if fits(k):
+        fit_k = k
+        if k - 1 > fail_k and not fits(k - 1):
+            fail_k = k - 1
+    else:
+        fail_k = k
+        if k + 1 < len(sizes) and fits(k + 1):
+            fit_k = k + 1
+    while fit_k - fail_k > 1:
+        mid = (fail_k + fit_k) // 2
+        if fits(mid):
+            fit_k = mid
+        else:
+            fail_k = mid
+
+    if fit_k == len(sizes):
+        return get_font(path, min_size), min_size
+    return get_font(path, sizes[fit_k]), sizes[fit_k]
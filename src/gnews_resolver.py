@@ -0,0 +1,166 @@
+"""
+Google News 中間URL（news.google.com/rss/articles/...）→ 配信元記事URLの解決
+
+1. オフライン解決: 記事IDはURLを含むprotobufをbase64urlエンコードしたもの（旧形式）なので、
+   デコードできればネットワークに出ずに配信元URLが分かる
+2. オンライン解決: 新形式（ID内に "AU_yqL" で始まる不透明なトークンしか無い）の場合は、
+   HEADでリダイレクトを1ホップずつ厳しいタイムアウトで追い、それでもGoogle内に留まる場合は
+   ページ先頭の数十KBだけ読んで配信元URL（data-n-au 属性）を探す
+3. 結果は output/cache/gnews_redirects.json に記事ID単位で保存する
+   （配信元URLが見つからなかった記事は短期間だけ記録して再試行しない。通信エラーは記録しない）
+
+どの段階でも時間の上限を超えたら諦める（従来のように全体がハングしない）。
+"""
+
+import base64
+import re
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from src.http_client import get_session, host_slot, stream_limited
+from src.local_store import JsonStore
+
+GNEWS_HOST = "news.google.com"
+MAX_REDIRECT_HOPS = 5
+HEAD_TIMEOUT = (3, 3)  # (connect, read) タイムアウト
+PAGE_MAX_BYTES = 64 * 1024  # リダイレクトページから読む最大バイト数
+PAGE_MAX_SECONDS = 4
+RESOLVE_BUDGET = 8  # 1記事あたりのオンライン解決の上限（秒）
+RESOLVED_TTL = 30 * 86400  # 解決済みURLを保持する期間（秒）
+FAILED_TTL = 86400  # 解決できなかった記事を再試行しない期間（秒）
+
+_ARTICLE_ID_RE = re.compile(r"/(?:rss/)?articles/([A-Za-z0-9_\-]+)")
+# 配信元URLを示すGoogle News固有の属性のみ使う（ページ内の一般的なリンクは gstatic・YouTube・
+# ポリシー等のことが多く、誤ったURLを長期間キャッシュしてしまうため使わない）
+_PAGE_URL_RE = re.compile(rb'data-n-au="(https?://[^"]+)"')
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def is_google_news_url(url):
+    return urlsplit(url).netloc.lower() == GNEWS_HOST and "/articles/" in url
+
+
+def _is_google_host(url):
+    host = urlsplit(url).netloc.lower().split(":")[0]
+    return host == "google.com" or host.endswith(".google.com") or ".google." in f".{host}"
+
+
+def _get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JsonStore("gnews_redirects.json")
+            now = time.time()
+            data = _store.data
+            for key in [k for k, v in data.items() if now - v["resolved_at"] > RESOLVED_TTL]:
+                del data[key]
+    return _store
+
+
+def decode_article_id(article_id):
+    """記事IDからオフラインで配信元URLを取り出す（新形式・不正なIDは None）"""
+    try:
+        raw = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    except (ValueError, TypeError):
+        return None
+    prefix = b"\x08\x13\x22"
+    if not raw.startswith(prefix):
+        return None
+    raw = raw[len(prefix) :]
+    if not raw:
+        return None
+    # 長さはvarint（1〜2バイト）
+    length = raw[0]
+    offset = 1
+    if length & 0x80:
+        if len(raw) < 2:
+            return None
+        length = (length & 0x7F) | (raw[1] << 7)
+        offset = 2
+    url_bytes = raw[offset : offset + length]
+    if url_bytes.startswith(b"AU_yqL") or not url_bytes.startswith((b"http://", b"https://")):
+        return None
+    try:
+        return url_bytes.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def _resolve_online(url):
+    """HEADでリダイレクトを追い、ダメならページ先頭から配信元URLを探す（時間予算付き）"""
+    started = time.monotonic()
+    session = get_session()
+    current = url
+    for _ in range(MAX_REDIRECT_HOPS):
+        if time.monotonic() - started > RESOLVE_BUDGET:
+            return None
+        with host_slot(current):
+            response = session.head(current, allow_redirects=False, timeout=HEAD_TIMEOUT)
+        location = response.headers.get("Location")
+        if response.status_code not in (301, 302, 303, 307, 308) or not location:
+            break
+        current = urljoin(current, location)
+        if not _is_google_host(current):
+            return current
+    if not _is_google_host(current):
+        return current
+    if urlsplit(current).netloc.lower() != GNEWS_HOST:
+        return None  # consent.google.com 等に飛ばされた場合は配信元URLが分からない
+
+    remaining = RESOLVE_BUDGET - (time.monotonic() - started)
+    if remaining <= 0:
+        return None
+    head = b""
+    with stream_limited(
+        current, max_bytes=PAGE_MAX_BYTES, timeout=HEAD_TIMEOUT, max_seconds=min(PAGE_MAX_SECONDS, remaining)
+    ) as (response, stream):
+        if response.status_code != 200:
+            return None
+        for chunk in stream:
+            head += chunk
+            match = _PAGE_URL_RE.search(head)
+            if match:
+                return match.group(1).decode("utf-8", errors="replace").replace("&amp;", "&")
+    return None
+
+
+def resolve_google_news_url(url):
+    """Google Newsの中間URLを配信元URLに解決する
+
+    Google News以外のURLはそのまま返す。解決できなければ None。
+    """
+    if not is_google_news_url(url):
+        return url
+    match = _ARTICLE_ID_RE.search(urlsplit(url).path)
+    if not match:
+        return None
+    article_id = match.group(1)
+
+    store = _get_store()
+    with store.lock:
+        cached = store.data.get(article_id)
+    if cached and (cached["url"] or time.time() - cached["resolved_at"] < FAILED_TTL):
+        return cached["url"] or None
+
+    resolved = decode_article_id(article_id)
+    method = "オフライン"
+    if resolved is None:
+        method = "オンライン"
+        try:
+            resolved = _resolve_online(url)
+        except Exception as e:
+            # 通信エラー等の一時的な失敗は記録しない（次回また解決を試みる）
+            print(f"  [WARN] Google News URL解決失敗: {type(e).__name__}: {e}")
+            return None
+
+    with store.lock:
+        store.data[article_id] = {"url": resolved or "", "resolved_at": time.time()}
+        store.save()
+    if resolved:
+        print(f"  [OK] Google News URL解決（{method}）: {resolved[:60]}")
+    else:
+        print(f"  [WARN] Google News URL未解決: {url[:60]}...")
+    return resolved
@@ -0,0 +1,132 @@
+"""
+HTTP共通クライアント（コネクションプール付きSession + 締め切り付き並列実行）
+
+YouTube Data API・RSS・記事スクレイプで1つのSessionを共有し、
+同じホストへの接続（TLSハンドシェイク）を使い回す。
+記事取得のように相手先サーバーが様々な場合は、ホストごとの同時接続数と
+レスポンスサイズ・所要時間の上限を設けて、1つの遅いサイトに全体が引きずられないようにする。
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; NewsBot/1.0)"
+POOL_CONNECTIONS = 16  # プールするホスト数
+POOL_MAXSIZE = 8  # 1ホストあたりの同時接続数
+PER_HOST_LIMIT = 2  # stream_limited() でのホストごとの同時リクエスト数
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024  # stream_limited() で読み込む最大バイト数
+CHUNK_SIZE = 16 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+_host_semaphores = {}  # ホスト名 -> Semaphore
+
+
+def get_session():
+    """プロセス共通のrequests.Sessionを返す（初回のみ作成）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = DEFAULT_USER_AGENT
+            _session = session
+    return _session
+
+
+def run_concurrently(func, items, max_workers=8, deadline=None, label="並列処理"):
+    """itemsをfuncで並列処理し、完了した順に (item, result) をyieldする
+
+    deadline（秒）を過ぎたら未完了の処理は待たずに打ち切る。
+    funcが例外を投げたitemは警告を出してスキップする。
+    yieldされた結果を受けて呼び出し側が次の処理を始められる（全件完了を待たない）。
+    """
+    items = list(items)
+    if not items:
+        return
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))))
+    futures = {executor.submit(func, item): item for item in items}
+    end_time = time.monotonic() + deadline if deadline else None
+    pending = set(futures)
+    try:
+        while pending:
+            timeout = None
+            if end_time is not None:
+                timeout = end_time - time.monotonic()
+                if timeout <= 0:
+                    break
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  [WARN] {label}失敗: {type(e).__name__}: {e}")
+                    continue
+                yield item, result
+        if pending:
+            print(f"  [WARN] {label}: 締め切り{deadline}秒超過のため{len(pending)}件を打ち切り")
+    finally:
+        # 実行中のスレッドは待たない（各リクエストは自身のtimeoutで終わる）
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def host_slot(url):
+    """ホストごとの同時リクエスト数を PER_HOST_LIMIT に制限する"""
+    host = urlsplit(url).netloc.lower()
+    with _session_lock:
+        semaphore = _host_semaphores.setdefault(host, threading.BoundedSemaphore(PER_HOST_LIMIT))
+    with semaphore:
+        yield
+
+
+class LimitedStream:
+    """サイズと所要時間に上限のあるレスポンス本文のチャンク列（stream_limited() が返す）"""
+
+    def __init__(self, response, max_bytes, max_seconds):
+        self.response = response
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.bytes_read = 0
+        self.truncated = False
+        self._started = time.monotonic()
+
+    def __iter__(self):
+        for chunk in self.response.iter_content(CHUNK_SIZE):
+            if self.bytes_read + len(chunk) > self.max_bytes:
+                chunk = chunk[: self.max_bytes - self.bytes_read]
+                self.truncated = True
+            self.bytes_read += len(chunk)
+            yield chunk
+            if self.truncated or (self.max_seconds and time.monotonic() - self._started > self.max_seconds):
+                self.truncated = True
+                return
+
+
+@contextmanager
+def stream_limited(url, max_bytes=MAX_RESPONSE_BYTES, timeout=(5, 10), max_seconds=None, **kwargs):
+    """サイズと所要時間に上限を設けてGETし、本文をチャンク単位で読む
+
+    max_bytes か max_seconds（秒）に達した時点で打ち切る
+    （少しずつ送ってくるサーバーでは read タイムアウトが効かないため、全体の時間でも区切る）。
+    呼び出し側が途中で読むのをやめれば、残りはダウンロードせずに接続を閉じる。
+
+    Yields:
+        (レスポンス, LimitedStream)
+    """
+    with host_slot(url):
+        response = get_session().get(url, stream=True, timeout=timeout, **kwargs)
+        try:
+            yield response, LimitedStream(response, max_bytes, max_seconds)
+        finally:
+            response.close()
+
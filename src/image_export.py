@@ -0,0 +1,84 @@
+"""
+サムネイル画像の書き出し（YouTubeのサムネイル上限 2MB 以内に圧縮）
+
+PNGは品質指定が効かず、1280x720でも数MBになることがあるため、
+JPEG（必要ならWebPも）を品質を下げながらメモリ上でエンコードし、上限に収まった最初の品質を採用する。
+品質を下げすぎて見た目が崩れないよう、元画像との差（縮小グレースケールの平均絶対差）が
+MAX_PERCEPTUAL_DIFF を超えた候補は使わない（縮小するのは一覧・スマホでの見え方に合わせるため）。
+"""
+
+import io
+
+from PIL import Image, ImageChops, ImageStat
+
+MAX_THUMBNAIL_BYTES = 2 * 1024 * 1024  # YouTube thumbnails.set の上限
+QUALITY_STEPS = (92, 88, 84, 80, 75, 70, 65, 60)
+MAX_PERCEPTUAL_DIFF = 3.0  # 0〜255。これを超える劣化は不採用
+DIFF_SIZE = (320, 180)
+EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}
+
+
+def perceptual_diff(a, b):
+    """2枚の画像の見た目の差（縮小グレースケールの平均絶対差、0〜255）"""
+    a = a.convert("L").resize(DIFF_SIZE, Image.BILINEAR)
+    b = b.convert("L").resize(DIFF_SIZE, Image.BILINEAR)
+    return ImageStat.Stat(ImageChops.difference(a, b)).mean[0]
+
+
+def _encode(img, fmt, quality):
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        # 文字主体のサムネイルは色差間引きで縁がにじむため、高品質時は 4:4:4 で保存
+        img.save(buf, "JPEG", quality=quality, subsampling=0 if quality >= 85 else 2)
+    elif fmt == "WEBP":
+        img.save(buf, "WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _best_for_format(img, fmt, max_bytes, max_diff):
+    """上限に収まる最高品質を探す。収まった時点で劣化が大きければこの形式は諦める"""
+    for quality in QUALITY_STEPS:
+        data = _encode(img, fmt, quality)
+        if len(data) > max_bytes:
+            continue
+        diff = perceptual_diff(img, Image.open(io.BytesIO(data)))
+        if diff > max_diff:
+            print(f"  [WARN] {fmt} q{quality}: 劣化が大きいため不採用 (diff={diff:.2f})")
+            return None
+        return data, quality, diff
+    return None
+
+
+def export_thumbnail(img, out_base, formats=("JPEG",), max_bytes=MAX_THUMBNAIL_BYTES, max_diff=MAX_PERCEPTUAL_DIFF):
+    """サムネイルを上限サイズ以内で書き出し、保存したパスを返す
+
+    Args:
+        img: PIL Image
+        out_base: 拡張子なしの出力パス（形式に応じて .jpg / .webp / .png を付ける）
+        formats: 試す形式（候補の中で最も小さいものを採用）
+    """
+    img = img.convert("RGB")
+    candidates = []
+    for fmt in formats:
+        result = _best_for_format(img, fmt.upper(), max_bytes, max_diff)
+        if result:
+            candidates.append((fmt.upper(), *result))
+
+    if candidates:
+        fmt, data, quality, diff = min(candidates, key=lambda c: len(c[1]))
+        label = f"{fmt} q{quality}, diff={diff:.2f}"
+    else:
+        # どの形式も条件を満たさない場合はPNG（上限超過ならAPI側で拒否されるため警告のみ）
+        fmt, data = "PNG", _encode(img, "PNG", None)
+        label = "PNG（フォールバック）"
+        if len(data) > max_bytes:
+            print(f"  [WARN] サムネイルが上限を超えています: {len(data) / 1024 / 1024:.1f}MB")
+
+    out_path = out_base + EXTENSIONS[fmt]
+    with open(out_path, "wb") as f:
+        f.write(data)
+    print(f"[OK] サムネイル書き出し: {out_path} ({len(data) / 1024:.0f}KB, {label})")
+    return out_path
+
@@ -0,0 +1,122 @@
+"""
+素材の事前収集（動画生成の実行前に別スケジュールで回す）
+
+YouTube検索・RSS取得・記事本文の取得を動画生成とは別に実行し、
+ランク付け済みの素材を output/cache/material.jsonl に1行1レコードで追記する。
+generate_content は MATERIAL_MAX_AGE 以内の最新レコードがあればそれを読むだけで済み、
+無ければ従来どおりその場で取得する（レコードの動画・記事の片方が空なら、空の方だけ取得する）。
+
+使い方:
+    python -m src.ingest                # CHANNEL_THEME のテーマで収集
+    python -m src.ingest --theme 園芸
+
+GitHub Actions では .github/workflows/ingest.yml が動画生成の数時間前に実行し、
+output/cache を actions/cache で daily_post.yml に引き継ぐ。
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+from src.local_store import CACHE_DIR
+
+MATERIAL_PATH = os.path.join(CACHE_DIR, "material.jsonl")
+MATERIAL_MAX_AGE = float(os.environ.get("MATERIAL_MAX_AGE_HOURS", "20")) * 3600  # 秒
+MATERIAL_KEEP_RECORDS = 30  # ファイルに残すレコード数（古いものから削除）
+
+_file_lock = threading.Lock()
+
+
+def _read_records():
+    if not os.path.exists(MATERIAL_PATH):
+        return []
+    records = []
+    with open(MATERIAL_PATH, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # 書き込み途中で落ちた行は無視
+    return records
+
+
+def save_material(theme, youtube, articles):
+    """収集した素材を1レコードとして追記する（古いレコードは MATERIAL_KEEP_RECORDS 件まで残す）"""
+    record = {"theme": theme, "harvested_at": time.time(), "youtube": youtube, "articles": articles}
+    with _file_lock:
+        os.makedirs(os.path.dirname(MATERIAL_PATH), exist_ok=True)
+        records = _read_records()
+        if len(records) >= MATERIAL_KEEP_RECORDS:
+            records = records[-(MATERIAL_KEEP_RECORDS - 1) :] + [record]
+            tmp_path = f"{MATERIAL_PATH}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for r in records:
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, MATERIAL_PATH)
+        else:
+            with open(MATERIAL_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return record
+
+
+def load_material(theme, max_age=MATERIAL_MAX_AGE):
+    """テーマの最新の事前収集素材を返す（max_age秒より古い・動画も記事も空なら None）
+
+    Returns:
+        {"theme", "harvested_at", "age_hours", "youtube": [...], "articles": [...]} / None
+    """
+    try:
+        with _file_lock:
+            records = _read_records()
+    except OSError as e:
+        print(f"[WARN] 事前収集素材の読み込み失敗: {e}")
+        return None
+    now = time.time()
+    for record in reversed(records):
+        if record.get("theme") != theme:
+            continue
+        if now - record.get("harvested_at", 0) > max_age:
+            return None
+        if not record.get("youtube") and not record.get("articles"):
+            return None
+        record["age_hours"] = (now - record["harvested_at"]) / 3600
+        return record
+    return None
+
+
+def prioritize_with_body(articles):
+    """本文を取得できた記事を優先し、同じ中では本文の長い順に並べる"""
+    return sorted(articles, key=lambda a: (not a.get("body"), -len(a.get("body", ""))))
+
+
+def harvest(theme):
+    """generate_content と同じ条件で素材を取得し、ランク付けして保存する"""
+    # 動画生成本体（src.main）の取得関数をそのまま使う（検索条件を二重管理しない）
+    from src.main import fetch_stats_articles, fetch_story_videos
+
+    started = time.monotonic()
+    print(f"===== 素材の事前収集: {theme} =====")
+    youtube = fetch_story_videos(theme)  # 類似除去・スコア順
+    articles = prioritize_with_body(fetch_stats_articles(theme))
+    save_material(theme, youtube, articles)
+    bodies = sum(1 for a in articles if a.get("body"))
+    print(
+        f"[OK] 事前収集完了: 動画{len(youtube)}件 / 記事{len(articles)}件（本文あり{bodies}件）"
+        f" {time.monotonic() - started:.1f}秒 → {MATERIAL_PATH}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="動画生成用の素材を事前収集する")
+    parser.add_argument("--theme", default=os.environ.get("CHANNEL_THEME", "暮らし"), help="チャンネルテーマ")
+    args = parser.parse_args()
+    harvest(args.theme)
+
+
+if __name__ == "__main__":
+    main()
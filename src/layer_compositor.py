@@ -0,0 +1,117 @@
+"""
+静止画レイヤーの合成（サムネイル・エンディング・クイズ冒頭で共通）
+
+背景・キャラ画像は (パス, サイズ) 単位でプロセス内に1回だけデコード・リサイズして保持し、
+合成は RGB の土台に RGBA レイヤーを重ねるだけにする（RGBA⇔RGB の変換は最後の1回のみ）。
+NumPy があればレイヤーごとに乗算済みアルファ（premultiplied alpha）の配列を1回だけ作り、
+合成は「src + dst × (1 - α)」の整数演算で行う。NumPy が無ければ Pillow の paste で同じ結果を得る。
+"""
+
+import os
+from functools import lru_cache
+
+from PIL import Image
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+LAYER_CACHE_SIZE = 64
+
+
+class Layer:
+    """合成用のRGBAレイヤー（乗算済みアルファの配列は初回合成時に1回だけ作る）"""
+
+    def __init__(self, image):
+        self.image = image if image.mode == "RGBA" else image.convert("RGBA")
+        self._premultiplied = None
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def width(self):
+        return self.image.width
+
+    @property
+    def height(self):
+        return self.image.height
+
+    def premultiplied(self):
+        """(RGB×α/255, α) の uint16 配列"""
+        if self._premultiplied is None:
+            rgba = np.asarray(self.image, dtype=np.uint16)
+            alpha = rgba[..., 3:4]
+            self._premultiplied = ((rgba[..., :3] * alpha + 127) // 255, alpha)
+        return self._premultiplied
+
+
+def _file_key(path):
+    path = os.path.abspath(path)
+    return path, os.path.getmtime(path)
+
+
+def load_layer(path, size=None, height=None):
+    """画像ファイルをRGBAレイヤーとして読み込む（size 指定で拡大縮小、height 指定で縦横比を保って縮小）
+
+    同じ (パス, 更新時刻, サイズ) はプロセス内で1回だけデコード・リサイズする。
+    """
+    return _load_layer(*_file_key(path), tuple(size) if size else None, height)
+
+
+@lru_cache(maxsize=LAYER_CACHE_SIZE)
+def _load_layer(path, mtime, size, height):
+    img = Image.open(path).convert("RGBA")
+    if height:
+        size = (int(img.width * height / img.height), height)
+    if size and img.size != size:
+        img = img.resize(size)
+    return Layer(img)
+
+
+def load_background(path, size, fallback_color=(0, 0, 0)):
+    """背景画像をRGBで size に合わせて読み込む（無ければ単色）。返り値は共有なので書き換えないこと"""
+    if path and os.path.exists(path):
+        return _load_background(*_file_key(path), tuple(size))
+    return solid_background(tuple(size), tuple(fallback_color))
+
+
+@lru_cache(maxsize=LAYER_CACHE_SIZE)
+def _load_background(path, mtime, size):
+    return Image.open(path).convert("RGB").resize(size)
+
+
+@lru_cache(maxsize=LAYER_CACHE_SIZE)
+def solid_background(size, color):
+    """単色背景（RGB）。返り値は共有なので書き換えないこと"""
+    return Image.new("RGB", size, color)
+
+
+def composite(base, placements):
+    """RGBの土台に (Layer, (x, y)) を順に重ねた新しいRGB画像を返す（土台は変更しない）"""
+    placements = [(layer, pos) for layer, pos in placements if layer is not None]
+    if not NUMPY_AVAILABLE:
+        out = base.convert("RGB") if base.mode != "RGB" else base.copy()
+        for layer, (x, y) in placements:
+            out.paste(layer.image, (int(x), int(y)), layer.image)
+        return out
+
+    out = np.array(base.convert("RGB") if base.mode != "RGB" else base, dtype=np.uint16)
+    height, width = out.shape[:2]
+    for layer, (x, y) in placements:
+        x, y = int(x), int(y)
+        # 土台からはみ出す部分を切り落とす
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(width, x + layer.width), min(height, y + layer.height)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        src_rgb, alpha = layer.premultiplied()
+        src_rgb = src_rgb[y0 - y : y1 - y, x0 - x : x1 - x]
+        alpha = alpha[y0 - y : y1 - y, x0 - x : x1 - x]
+        dst = out[y0:y1, x0:x1]
+        out[y0:y1, x0:x1] = src_rgb + (dst * (255 - alpha) + 127) // 255
+    return Image.fromarray(out.astype(np.uint8), "RGB")
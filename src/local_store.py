@@ -0,0 +1,55 @@
+"""
+ローカル永続ストア（実行をまたいで使うキャッシュ・集計用のJSONファイル）
+
+保存先は output/cache/（環境変数 LOCAL_CACHE_DIR で変更可）。
+書き込みは一時ファイル経由で置き換えるため、途中で落ちても壊れたJSONは残らない。
+GitHub Actions では output/cache と output/topic_history.jsonl を actions/cache で実行間に引き継ぐ
+（.github/workflows/daily_post.yml の Restore/Save local state）。
+"""
+
+import json
+import os
+import threading
+
+CACHE_DIR = os.environ.get("LOCAL_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "output", "cache"
+)
+
+
+class JsonStore:
+    """1つのJSONファイルを辞書として読み書きする（スレッドセーフ）
+
+    Args:
+        name: CACHE_DIR内のファイル名（例: "youtube_quota.json"）
+    """
+
+    def __init__(self, name):
+        self.path = os.path.join(CACHE_DIR, name)
+        self.lock = threading.RLock()
+        self._data = None
+
+    @property
+    def data(self):
+        """ファイルの中身（初回アクセス時に読み込み。壊れていれば空で始める）"""
+        with self.lock:
+            if self._data is None:
+                self._data = {}
+                if os.path.exists(self.path):
+                    try:
+                        with open(self.path, encoding="utf-8") as f:
+                            self._data = json.load(f)
+                    except (OSError, ValueError) as e:
+                        print(f"[WARN] ローカルストア読み込み失敗（空で続行）: {os.path.basename(self.path)}: {e}")
+            return self._data
+
+    def save(self):
+        """現在の内容をファイルへ書き出す"""
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"[WARN] ローカルストア保存失敗: {os.path.basename(self.path)}: {e}")
@@ -72,6 +72,26 @@ except ImportError:
     # 直接実行時のパス解決
     sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
     from src.youtube_uploader import YouTubeUploader
+from src.similarity_index import SimilarityIndex, find_similar_pairs
+from src.text_scanner import PatternScanner
+from src.tts_lexicon import load_tts_lexicon
+from src.prompt_builder import PromptBuilder, disable_context_cache, get_context_cache, static_section
+from src.http_client import run_concurrently, stream_limited
+from src.article_extractor import extract_article_text
+from src.article_cache import get_article_cache
+from src.feed_fetcher import FeedFetcher, merge_feed_entries
+from src.gnews_resolver import resolve_google_news_url
+from src.ingest import load_material
+from src.candidate_ranking import rank_articles, rank_videos
+from src.topic_history import TopicHistory
+from src.font_registry import get_font, text_width
+from src.text_wrap import wrap_text
+from src.image_export import export_thumbnail
+from src.chalk_library import REFILL_WAIT_SECONDS, ChalkLibrary
+from src.quiz_chart import QuizChart, write_chart_video
+from src.layer_compositor import composite, load_background, load_layer
+from src.thumbnail_renderer import COLOR_SCHEMES, contact_sheet, mood_from_script, render_thumbnail, render_variants
+from src.youtube_api import VIDEOS_BATCH_SIZE, YouTubeDataClient
 
 
 # 音声結合はffmpegを使用、動画生成はRemotion専用
@@ -143,17 +163,22 @@ COLOR_SUBTITLE_BORDER = "#000000"
 import random
 from urllib.parse import quote
 
-import feedparser
 import requests
-from bs4 import BeautifulSoup
+
+
+YOUTUBE_SEARCH_DEADLINE = 20  # キーワード検索の並列実行全体の締め切り（秒）
 
 
 def fetch_trending_youtube_videos(keywords=None, max_videos=5, days=5, min_views=1000, skip_words=None):
-    """YouTube Data API v3で話題の動画を取得する（コメント数順）
+    """YouTube Data API v3で話題の動画を取得する（新しさ+反応のスコア順）
 
     全チャンネル共通設計: GOOGLE_API_KEYSから自動でAPIキーを取得。
-    フィルタ: 直近N日以内 + 最低再生回数以上 + コメント数順ソート
+    フィルタ: 直近N日以内 + 最低再生回数以上 + 類似タイトル除去 + スコア順（新しさ+コメント数・再生数）
+    キーワード検索は共通Session上で並列実行し、全体に締め切りを設ける。
+    統計情報（Videos API）はIDが50件たまった時点で検索完了を待たずに取得を始める。
+    APIキーは残りquotaの多い順に選び、同じ日の再実行ではキャッシュ済みのレスポンスを使う。
     """
+    from concurrent.futures import ThreadPoolExecutor
     from datetime import datetime, timedelta, timezone
 
     if keywords is None:
@@ -168,118 +193,121 @@ def fetch_trending_youtube_videos(keywords=None, max_videos=5, days=5, min_views
         print("[WARN] GOOGLE_API_KEYS未設定。YouTube Data API使用不可")
         return []
 
-    api_key = random.choice(api_keys)  # ランダムでquota分散
-    published_after = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    # APIには日付単位に丸めて渡し（同じ日の再実行ではSearch APIのキャッシュが当たる）、
+    # 正確な期間は受信後に publishedAt で絞り込む
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    published_after = cutoff.strftime("%Y-%m-%dT00:00:00Z")
+    cutoff_str = cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")
+    client = YouTubeDataClient(api_keys)
+
+    def search(keyword):
+        """1キーワード分の検索（quotaの残っているキーを選び、403なら別キーで再試行）"""
+        print(f"[YouTube API] キーワード「{keyword}」で検索中...")
+        return client.search(
+            part="snippet",
+            q=keyword,
+            type="video",
+            order="date",
+            publishedAfter=published_after,
+            regionCode="JP",
+            relevanceLanguage="ja",
+            maxResults=15,
+        )
 
     all_video_ids = []
     seen_ids = set()
     shuffled_keywords = keywords.copy()
     random.shuffle(shuffled_keywords)
 
-    # Step 1: Search APIで動画IDを収集
-    for keyword in shuffled_keywords:
-        try:
-            print(f"[YouTube API] キーワード「{keyword}」で検索中...")
-            resp = requests.get(
-                "https://www.googleapis.com/youtube/v3/search",
-                params={
-                    "part": "snippet",
-                    "q": keyword,
-                    "type": "video",
-                    "order": "date",
-                    "publishedAfter": published_after,
-                    "regionCode": "JP",
-                    "relevanceLanguage": "ja",
-                    "maxResults": 15,
-                    "key": api_key,
-                },
-                timeout=(5, 10),
-            )  # (connect, read) タイムアウト
-
-            if resp.status_code == 200:
-                data = resp.json()
-                for item in data.get("items", []):
-                    video_id = item.get("id", {}).get("videoId", "")
-                    if video_id and video_id not in seen_ids:
-                        title = item.get("snippet", {}).get("title", "")
-                        if any(sw in title for sw in skip_words):
-                            print(f"  [SKIP] 除外: {title[:40]}...")
-                            continue
-                        seen_ids.add(video_id)
-                        all_video_ids.append(
-                            {
-                                "video_id": video_id,
-                                "title": title,
-                                "channel": item.get("snippet", {}).get("channelTitle", "不明"),
-                                "published": item.get("snippet", {}).get("publishedAt", ""),
-                            }
-                        )
-                print(f"  → フィルタ後{len(all_video_ids)}件")
-            elif resp.status_code == 403:
-                print("  [WARN] APIキー制限")
-                if len(api_keys) > 1:
-                    api_key = api_keys[1]
-                else:
-                    break
-            else:
-                print(f"  [WARN] YouTube API HTTP {resp.status_code}")
-        except (Exception, KeyboardInterrupt) as e:
-            print(f"  [WARN] YouTube API検索失敗（{keyword}）: {type(e).__name__}: {e}")
-            continue  # 次のキーワードを試す
+    # Step 1: Search APIで動画IDを並列収集（IDが50件たまるごとにStep 2を先行開始）
+    stats_executor = ThreadPoolExecutor(max_workers=2)
+    stats_futures = []
+    queued_count = 0
+
+    def queue_stats_batch(final=False):
+        nonlocal queued_count
+        while len(all_video_ids) - queued_count >= VIDEOS_BATCH_SIZE or (
+            final and queued_count < len(all_video_ids)
+        ):
+            batch = [v["video_id"] for v in all_video_ids[queued_count : queued_count + VIDEOS_BATCH_SIZE]]
+            stats_futures.append(stats_executor.submit(client.video_statistics, batch))
+            queued_count += len(batch)
+
+    searches = run_concurrently(
+        search,
+        shuffled_keywords,
+        max_workers=len(shuffled_keywords),
+        deadline=YOUTUBE_SEARCH_DEADLINE,
+        label="YouTube API検索",
+    )
+    for keyword, items in searches:
+        for item in items:
+            video_id = item.get("id", {}).get("videoId", "")
+            if item.get("snippet", {}).get("publishedAt", cutoff_str) < cutoff_str:
+                continue
+            if video_id and video_id not in seen_ids:
+                title = item.get("snippet", {}).get("title", "")
+                if any(sw in title for sw in skip_words):
+                    print(f"  [SKIP] 除外: {title[:40]}...")
+                    continue
+                seen_ids.add(video_id)
+                all_video_ids.append(
+                    {
+                        "video_id": video_id,
+                        "title": title,
+                        "channel": item.get("snippet", {}).get("channelTitle", "不明"),
+                        "published": item.get("snippet", {}).get("publishedAt", ""),
+                    }
+                )
+        print(f"  → 「{keyword}」完了: フィルタ後累計{len(all_video_ids)}件")
+        queue_stats_batch()
 
     if not all_video_ids:
+        stats_executor.shutdown(wait=False)
         print("[WARN] YouTube API検索結果なし")
         return []
 
-    # Step 2: Videos APIで再生回数・コメント数を取得
+    # Step 2: Videos APIで再生回数・コメント数を取得（残りのIDをまとめて投入）
     print(f"--- 動画統計情報を取得中（{len(all_video_ids)}件） ---")
-    enriched_videos = []
-    batch_ids = [v["video_id"] for v in all_video_ids]
-
-    for i in range(0, len(batch_ids), 50):
-        batch = batch_ids[i : i + 50]
+    queue_stats_batch(final=True)
+    stats_map = {}
+    for future in stats_futures:
         try:
-            resp = requests.get(
-                "https://www.googleapis.com/youtube/v3/videos",
-                params={
-                    "part": "statistics",
-                    "id": ",".join(batch),
-                    "key": api_key,
-                },
-                timeout=(5, 10),
-            )
-            if resp.status_code == 200:
-                stats_map = {item["id"]: item["statistics"] for item in resp.json().get("items", [])}
-                for v in all_video_ids:
-                    if v["video_id"] in stats_map:
-                        s = stats_map[v["video_id"]]
-                        views = int(s.get("viewCount", 0))
-                        comments = int(s.get("commentCount", 0))
-                        if views >= min_views:
-                            enriched_videos.append(
-                                {
-                                    "title": v["title"],
-                                    "channel": v["channel"],
-                                    "url": f"https://www.youtube.com/watch?v={v['video_id']}",
-                                    "source": "YouTube",
-                                    "views": f"{views:,}回再生",
-                                    "views_count": views,
-                                    "comments": f"{comments:,}件コメント",
-                                    "comments_count": comments,
-                                    "published": v["published"],
-                                }
-                            )
-                        else:
-                            print(f"  [SKIP] 再生数不足({views}): {v['title'][:40]}...")
+            stats_map.update(future.result())
         except Exception as e:
             print(f"  [WARN] Videos API失敗: {e}")
+    stats_executor.shutdown(wait=False)
 
-    # Step 3: コメント数順でソート
-    enriched_videos.sort(key=lambda x: x.get("comments_count", 0), reverse=True)
+    enriched_videos = []
+    for v in all_video_ids:
+        if v["video_id"] in stats_map:
+            s = stats_map[v["video_id"]]
+            views = int(s.get("viewCount", 0))
+            comments = int(s.get("commentCount", 0))
+            if views >= min_views:
+                enriched_videos.append(
+                    {
+                        "title": v["title"],
+                        "channel": v["channel"],
+                        "url": f"https://www.youtube.com/watch?v={v['video_id']}",
+                        "source": "YouTube",
+                        "views": f"{views:,}回再生",
+                        "views_count": views,
+                        "comments": f"{comments:,}件コメント",
+                        "comments_count": comments,
+                        "published": v["published"],
+                    }
+                )
+            else:
+                print(f"  [SKIP] 再生数不足({views}): {v['title'][:40]}...")
+
+    # Step 3: 類似タイトルをまとめ、新しさ+反応（コメント数重視）のスコア順に並べる
+    enriched_videos = rank_videos(enriched_videos)
     for i, v in enumerate(enriched_videos[:max_videos], 1):
         print(f"  [TOP{i}] {v['title'][:50]}... ({v['views']}, {v['comments']})")
 
     print(f"[OK] YouTube動画取得完了: {len(enriched_videos)}件→上位{min(max_videos, len(enriched_videos))}件")
+    print(f"  [QUOTA] 推定残りquota: {client.accountant.summary(api_keys)}")
     return enriched_videos[:max_videos]
 
 
@@ -287,6 +315,10 @@ def fetch_trending_youtube_videos(keywords=None, max_videos=5, days=5, min_views
 def fetch_news_from_rss(keywords, max_articles=5):
     """Google News RSSからキーワードでニュース記事を取得する
 
+    全キーワードのフィードを並列に取得し（未変更のフィードは304で解析も省略）、
+    キーワード順にマージして正規化URL・正規化タイトルで重複を除く。
+    さらに類似タイトルを1件にまとめ、新しさ+掲載媒体数のスコア順に返す。
+
     Args:
         keywords: 検索キーワードのリスト（例: ["テーマ名", "関連ワード"]）
         max_articles: 取得する記事の最大数
@@ -294,107 +326,83 @@ def fetch_news_from_rss(keywords, max_articles=5):
     Returns:
         [{"title": "見出し", "url": "記事URL", "published": "公開日"}]
     """
-    articles = []
-    seen_urls = set()
-
+    feeds = {
+        keyword: f"https://news.google.com/rss/search?q={quote(keyword)}&hl=ja&gl=JP&ceid=JP:ja" for keyword in keywords
+    }
+    print(f"[RSS] {len(feeds)}キーワードを並列検索中: {', '.join(keywords)}")
+    results = FeedFetcher().fetch_all(feeds)
     for keyword in keywords:
-        try:
-            # Google News RSS URL
-            encoded_keyword = quote(keyword)
-            rss_url = f"https://news.google.com/rss/search?q={encoded_keyword}&hl=ja&gl=JP&ceid=JP:ja"
-            print(f"[RSS] キーワード「{keyword}」で検索中...")
-
-            # requestsでXMLを取得してからfeedparserで解析（SSL問題回避）
-            rss_response = requests.get(
-                rss_url, timeout=15, headers={"User-Agent": "Mozilla/5.0 (compatible; NewsBot/1.0)"}
-            )
-            if rss_response.status_code != 200:
-                print(f"[WARN] RSS HTTP {rss_response.status_code}: {keyword}")
-                continue
+        if keyword in results and not results[keyword]:
+            print(f"[WARN] 「{keyword}」のニュースが見つかりません")
 
-            feed = feedparser.parse(rss_response.text)
-
-            if not feed.entries:
-                print(f"[WARN] 「{keyword}」のニュースが見つかりません")
-                continue
-
-            for entry in feed.entries:
-                if len(articles) >= max_articles:
-                    break
+    # 類似タイトル（転載・配信先違い）をまとめてから、新しさ+掲載媒体数のスコア順に上位を取る
+    articles = merge_feed_entries([results[k] for k in keywords if k in results])
+    articles = rank_articles(articles)[:max_articles]
+    for i, article in enumerate(articles, 1):
+        print(f"  [{i}] {article['title'][:50]}...")
 
-                url = entry.get("link", "")
-                # 重複排除
-                if url in seen_urls:
-                    continue
-                seen_urls.add(url)
+    print(f"[OK] RSS取得完了: {len(articles)}件")
+    return articles
 
-                article = {
-                    "title": entry.get("title", ""),
-                    "url": url,
-                    "published": entry.get("published", ""),
-                    "source": entry.get("source", {}).get("title", "") if hasattr(entry, "source") else "",
-                }
-                articles.append(article)
-                print(f"  [{len(articles)}] {article['title'][:50]}...")
 
-        except Exception as e:
-            print(f"[WARN] RSS取得失敗（{keyword}）: {e}")
-            continue
-
-    print(f"[OK] RSS取得完了: {len(articles)}件")
-    return articles[:max_articles]
+ARTICLE_SCRAPE_DEADLINE = 25  # 記事本文取得（全件）の締め切り（秒）
+ARTICLE_MAX_BYTES = 1024 * 1024  # 1記事あたりに読み込むHTMLの上限
+ARTICLE_MAX_SECONDS = 12  # 1記事あたりの取得時間の上限（秒）
+BROWSER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 
 def scrape_article_text(url, max_chars=2000):
-    """記事URLから本文テキストを取得する"""
-    # Google News中間URLはリダイレクトでハングするためスキップ
-    if "news.google.com/rss/articles/" in url:
+    """記事URLから本文テキストを取得する
+
+    共通Sessionでホストごとの同時接続数を制限し、HTMLはサイズ・時間の上限までしか読まない。
+    HTMLはチャンク単位で逐次解析し、本文がmax_charsに達したら残りは読まない。
+    取得した本文は正規化URL単位でキャッシュし、期限切れ後は条件付きGETで再検証する。
+    """
+    # Google News中間URLは配信元URLに解決してから取得する（解決できなければスキップ）
+    url = resolve_google_news_url(url)
+    if not url:
         return ""
+    article_cache = get_article_cache()
+    cached = article_cache.get(url, max_chars)
+    if cached and article_cache.is_fresh(cached):
+        print(f"  [CACHE] 本文キャッシュ使用: {len(cached['body'][:max_chars])}文字")
+        return cached["body"][:max_chars]
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
+        headers = {"User-Agent": BROWSER_USER_AGENT, **article_cache.conditional_headers(cached)}
 
         # Google Newsのリダイレクトを解決
-        response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-
-        if response.status_code != 200:
-            print(f"  [WARN] HTTP {response.status_code}: {url[:60]}...")
-            return ""
-
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # 不要な要素を除去（広告、ナビ、スクリプト等）
-        for tag in soup.find_all(["script", "style", "nav", "header", "footer", "aside", "iframe", "noscript"]):
-            tag.decompose()
-
-        # <article>タグがあればそこから取得（最も正確）
-        article_tag = soup.find("article")
-        if article_tag:
-            paragraphs = article_tag.find_all("p")
-        else:
-            # なければ本文全体の<p>タグから取得
-            paragraphs = soup.find_all("p")
-
-        # テキスト結合
-        text_parts = []
-        total_chars = 0
-        for p in paragraphs:
-            text = p.get_text(strip=True)
-            if len(text) < 10:  # 短すぎるのはスキップ（ボタンラベル等）
-                continue
-            text_parts.append(text)
-            total_chars += len(text)
-            if total_chars >= max_chars:
-                break
-
-        body = "\n".join(text_parts)
+        with stream_limited(
+            url,
+            max_bytes=ARTICLE_MAX_BYTES,
+            timeout=(5, 10),
+            max_seconds=ARTICLE_MAX_SECONDS,
+            headers=headers,
+            allow_redirects=True,
+        ) as (response, stream):
+            if response.status_code == 304 and cached:
+                article_cache.touch(url)
+                print(f"  [CACHE] 未変更(304): {len(cached['body'][:max_chars])}文字")
+                return cached["body"][:max_chars]
+            if response.status_code != 200:
+                print(f"  [WARN] HTTP {response.status_code}: {url[:60]}...")
+                return ""
+            # charset指定がなければ<meta charset>で判定（requestsの既定ISO-8859-1で化けるのを防ぐ）
+            content_type = response.headers.get("Content-Type", "").lower()
+            charset = response.encoding if "charset" in content_type else None
+            # 本文がmax_charsに達した時点で読み込みをやめる（残りはダウンロードしない）
+            body, stopped_early = extract_article_text(stream, charset, max_chars)
+
+        if stream.truncated:
+            print(f"  [INFO] HTML上限で打ち切り（{stream.bytes_read:,}バイト）: {url[:60]}...")
+        elif stopped_early:
+            print(f"  [INFO] 本文{max_chars}文字に到達（{stream.bytes_read:,}バイトで読み込み終了）")
 
         if len(body) < 50:
             print(f"  [WARN] 本文が短すぎます（{len(body)}文字）: {url[:60]}...")
             return ""
 
         print(f"  [OK] 本文取得: {len(body)}文字")
+        article_cache.put(url, body[:max_chars], max_chars, response.headers)
         return body[:max_chars]
 
     except requests.Timeout:
@@ -405,6 +413,64 @@ def scrape_article_text(url, max_chars=2000):
         return ""
 
 
+def scrape_articles(articles, max_workers=6, deadline=ARTICLE_SCRAPE_DEADLINE):
+    """記事リストの本文を並列取得して article["body"] に入れる
+
+    締め切りまでに取得できなかった記事は body="" のまま続行する。
+    """
+
+    def scrape(article):
+        # Google News中間URLは配信元URLに置き換える（要約時の出典にも使う）
+        resolved = resolve_google_news_url(article["url"])
+        if resolved and resolved != article["url"]:
+            article["google_news_url"] = article["url"]
+            article["url"] = resolved
+        return scrape_article_text(resolved) if resolved else ""
+
+    for article in articles:
+        article["body"] = ""
+    results = run_concurrently(
+        scrape,
+        articles,
+        max_workers=max_workers,
+        deadline=deadline,
+        label="記事本文取得",
+    )
+    for article, body in results:
+        article["body"] = body
+    return articles
+
+
+def story_keywords_for(theme):
+    """ストーリー動画のYouTube検索キーワード（CHANNEL_THEMEベースで動的生成）"""
+    return [
+        f"{theme} 暮らし 実態",
+        f"{theme} 生活費",
+        f"{theme} リアル",
+        f"{theme} 節約 日常",
+        f"{theme} 密着",
+        f"{theme} コツ",
+        f"{theme} シニア",
+        f"{theme} 体験談",
+    ]
+
+
+def stats_rss_keywords_for(theme):
+    """統計データ（チャート用）記事のRSS検索キーワード"""
+    return [f"{theme} 生活費", f"{theme} 最新", f"シニア {theme}"]
+
+
+def fetch_story_videos(theme):
+    """テーマ関連のストーリー動画を取得する（generate_content Part 1 / 事前収集 共通）"""
+    return fetch_trending_youtube_videos(keywords=story_keywords_for(theme), max_videos=8, days=14, min_views=300)
+
+
+def fetch_stats_articles(theme):
+    """テーマ関連の統計データ記事を本文付きで取得する（generate_content Part 2 / 事前収集 共通）"""
+    articles = fetch_news_from_rss(keywords=stats_rss_keywords_for(theme), max_articles=2)
+    return scrape_articles(articles) if articles else []
+
+
 def summarize_youtube_for_script(videos, channel_theme="暮らし"):
     """YouTube市民生活インタビュー動画をGeminiで台本用に要約する
 
@@ -522,23 +588,197 @@ def summarize_news_for_script(articles, channel_theme="暮らし"):
 # ==========================================
 # JSON抽出ヘルパー（Llamaモデル用）
 # ==========================================
-def extract_json_from_text(text):
+def _scan_json_span(text, start):
+    """start位置の括弧から1パスで走査し、対応する閉じ括弧までの範囲を返す
+
+    文字列リテラル内の括弧・エスケープは無視する。
+    閉じ括弧まで到達しない（出力途中で切れた）場合は修復用の走査状態を返す。
+
+    Returns:
+        (end, state): 完結していれば end=閉じ括弧の次の位置, state=None
+                      途中で切れていれば end=None, state=修復用の情報dict
+    """
+    stack = []  # [(括弧文字, 開始位置, 親のキー名)]
+    last_comma = None  # (カンマ位置, その時点のstack)
+    pending_key = None  # 直前のオブジェクトキー（":"の直前の文字列）
+    last_string = None
+    in_string = False
+    escape = False
+    string_start = 0
+
+    for pos in range(start, len(text)):
+        ch = text[pos]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                last_string = text[string_start + 1 : pos]
+            continue
+
+        if ch == '"':
+            in_string = True
+            string_start = pos
+        elif ch in "{[":
+            stack.append((ch, pos, pending_key))
+            pending_key = None
+        elif ch in "}]":
+            if not stack or stack[-1][0] != ("{" if ch == "}" else "["):
+                # 括弧の対応が壊れている → この候補は不採用
+                return None, None
+            stack.pop()
+            if not stack:
+                return pos + 1, None
+        elif ch == ":":
+            pending_key = last_string
+        elif ch == ",":
+            pending_key = None
+            last_comma = (pos, list(stack))
+
+    return None, {"stack": stack, "last_comma": last_comma, "in_string": in_string}
+
+
+def _close_stack(stack):
+    """未閉鎖の括弧スタックを閉じる文字列を返す"""
+    return "".join("}" if ch == "{" else "]" for ch, _, _ in reversed(stack))
+
+
+def _strip_trailing_commas(text):
+    """閉じ括弧直前の余分なカンマ（文字列リテラル外）を取り除く
+
+    Returns:
+        (修正後の文字列, 取り除いた個数)
     """
-    テキストからJSON部分を抽出する。
-    Llamaモデルは説明テキスト + JSONを返すことがあるため。
+    out = []
+    removed = 0
+    in_string = False
+    escape = False
+    for pos, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = text[pos + 1 :].lstrip()
+            if rest[:1] in ("}", "]"):
+                removed += 1
+                continue
+        out.append(ch)
+    return "".join(out), removed
+
+
+def _repair_truncated_json(text, start, state):
+    """出力途中で切れたJSONを修復する
+
+    配列の途中で切れたオブジェクト要素（台本scriptの最終行など）は丸ごと捨てる。
+    それ以外は、値や閉じ括弧の直後で切れていれば括弧を閉じるだけにし、
+    値の途中で切れている場合だけ最後の区切りカンマまで戻して括弧を閉じる。
+
+    Returns:
+        (修復後のJSON文字列, 修復内容のリスト) / 修復不能なら (None, [])
+    """
+    stack = state["stack"]
+
+    # 1. 配列要素のオブジェクトが途中で切れている → その要素ごと捨てる（最も内側を優先）
+    for depth in range(len(stack) - 1, 0, -1):
+        ch, obj_start, _ = stack[depth]
+        parent_ch, _, parent_key = stack[depth - 1]
+        if ch == "{" and parent_ch == "[":
+            head = text[start:obj_start].rstrip()
+            if head.endswith(","):
+                head = head[:-1].rstrip()
+            closing = _close_stack(stack[:depth])
+            label = parent_key or "配列"
+            return head + closing, [f"'{label}'の途中で切れた最終要素を削除", f"閉じ括弧を補完: {closing}"]
+
+    # 2. 完結した値・閉じ括弧の直後で切れている → 括弧を閉じるだけ（パースできる場合のみ）
+    tail = text[start:].rstrip()
+    if not state.get("in_string") and tail.endswith(("}", "]", '"')):
+        closing = _close_stack(stack)
+        try:
+            json.loads(tail + closing)
+            return tail + closing, [f"閉じ括弧を補完: {closing}"]
+        except json.JSONDecodeError:
+            pass  # 末尾がキー名だった等 → カンマまで戻す
+
+    # 3. 最後のカンマで切り、その時点の括弧を閉じる
+    last_comma = state["last_comma"]
+    if last_comma:
+        comma_pos, comma_stack = last_comma
+        closing = _close_stack(comma_stack)
+        repairs = ["途中で切れた末尾の値を削除", f"閉じ括弧を補完: {closing}"]
+        return text[start:comma_pos].rstrip() + closing, repairs
+
+    return None, []
+
+
+def parse_llm_json(text, expect="object"):
     """
-    # コードブロック内のJSONを抽出
-    code_block_match = re.search(r"```(?:json)?\s*\n?([\s\S]*?)\n?```", text)
-    if code_block_match:
-        return code_block_match.group(1).strip()
+    LLM出力からJSONを抽出・パースする（途中切れは修復してリカバリー）。
 
-    # {で始まり}で終わる部分を抽出
-    json_match = re.search(r"\{[\s\S]*\}", text)
-    if json_match:
-        return json_match.group(0)
+    前置きの説明文・後ろのコメント（波括弧を含んでいても可）は無視し、
+    最初に完結してパースできる括弧の範囲を1パスで切り出す。
+    max_tokens到達などで途中で切れた場合は、最後の不完全な配列要素を捨てて
+    括弧を補完する（再生成のLLM呼び出しを節約するため）。
 
-    # そのまま返す（JSONかもしれない）
-    return text.strip()
+    Args:
+        text: LLMの応答テキスト
+        expect: "object"（{...}）または "array"（[...]）
+
+    Returns:
+        (パース結果, 修復内容のリスト)  ※修復なしなら空リスト
+
+    Raises:
+        ValueError: JSONが見つからない・修復できない場合（json.JSONDecodeErrorを含む）
+    """
+    open_ch = "{" if expect == "object" else "["
+
+    # コードブロックがあればその開始位置以降を優先して探す（閉じ```がない途中切れにも対応）
+    search_from = 0
+    fence = re.search(r"```(?:json)?\s*\n?", text)
+    if fence and text.find(open_ch, fence.end()) >= 0:
+        search_from = fence.end()
+
+    last_error = None
+    start = text.find(open_ch, search_from)
+    while start >= 0:
+        end, state = _scan_json_span(text, start)
+        if end is not None:
+            try:
+                return json.loads(text[start:end]), []
+            except json.JSONDecodeError as e:
+                last_error = e
+            # 閉じ括弧直前の余分なカンマ（LLMによくある）なら取り除いて再挑戦
+            stripped, removed = _strip_trailing_commas(text[start:end])
+            if removed:
+                try:
+                    return json.loads(stripped), [f"閉じ括弧直前の余分なカンマを削除（{removed}箇所）"]
+                except json.JSONDecodeError as e:
+                    last_error = e
+            # 説明文中の {theme} 等 → この範囲の外側の次の候補へ（内側の断片は採用しない）
+            start = text.find(open_ch, end)
+            continue
+        elif state is not None:
+            # 末尾まで閉じなかった = 途中切れ → その場で修復を試す
+            repaired, repairs = _repair_truncated_json(text, start, state)
+            if repaired is not None:
+                try:
+                    return json.loads(repaired), repairs
+                except json.JSONDecodeError as e:
+                    last_error = e
+        start = text.find(open_ch, start + 1)
+
+    if last_error:
+        raise last_error
+    # そのままパースを試す（JSONかもしれない）
+    return json.loads(text.strip()), []
 
 
 # ==========================================
@@ -548,7 +788,7 @@ def extract_json_from_text(text):
 # ==========================================
 
 
-def call_llm_with_fallback(messages, json_mode=False, max_tokens=4000, temperature=0.7):
+def call_llm_with_fallback(messages, json_mode=False, max_tokens=4000, temperature=0.7, static_prefix=None):
     """
     Gemini 2.0 FlashでLLM呼び出し（複数キーでリトライ）。
 
@@ -557,6 +797,8 @@ def call_llm_with_fallback(messages, json_mode=False, max_tokens=4000, temperatu
         json_mode: JSON形式で出力するか
         max_tokens: 最大トークン数
         temperature: 生成温度
+        static_prefix: 毎回同じ静的テキスト（キャラクター設定等）。プロンプトの先頭に置き、
+                       十分大きく2回目以降の使用ならGeminiのコンテキストキャッシュで再送を省く
 
     Returns:
         str: LLMの応答テキスト
@@ -586,11 +828,30 @@ def call_llm_with_fallback(messages, json_mode=False, max_tokens=4000, temperatu
                 # messagesをGemini形式に変換
                 prompt_text = "\n\n".join([f"{m['role']}: {m['content']}" for m in messages])
 
-                response = client.models.generate_content(
-                    model="gemini-2.0-flash",
-                    contents=prompt_text,
-                    config=genai_types.GenerateContentConfig(temperature=temperature, max_output_tokens=max_tokens),
-                )
+                model = "gemini-2.0-flash"
+                cache_name = None
+                if static_prefix:
+                    cache_name = get_context_cache(client, api_key, model, static_prefix)
+                    if not cache_name:
+                        prompt_text = f"{static_prefix}\n\n{prompt_text}"
+
+                def generate(contents, cached_content):
+                    return client.models.generate_content(
+                        model=model,
+                        contents=contents,
+                        config=genai_types.GenerateContentConfig(
+                            temperature=temperature, max_output_tokens=max_tokens, cached_content=cached_content
+                        ),
+                    )
+
+                try:
+                    response = generate(prompt_text, cache_name)
+                except Exception as e:
+                    if not cache_name:
+                        raise
+                    # キャッシュ作成は成功しても参照で失敗することがある → 同じキーでプレフィックスを直接送って再試行
+                    disable_context_cache(f"キャッシュ参照失敗: {e}")
+                    response = generate(f"{static_prefix}\n\n{prompt_text}", None)
                 result = response.text
                 print(f"[OK] Gemini成功（key {current_index + 1}）: {len(result)}文字")
                 return result
@@ -604,18 +865,21 @@ def call_llm_with_fallback(messages, json_mode=False, max_tokens=4000, temperatu
 
 
 def draw_text_bold_with_border(draw, text, position, font, text_color, border_color, border_width, is_bold=False):
+    """縁取り付きテキストを描画する
+
+    縁取りはPillowのstroke_width（FreeTypeのストローカーで丸く太らせたグリフを1回で描く）を使う。
+    旧実装の「半径内の全オフセットに文字列を描く」（約πr²回の描画）と同じ見た目を1回の描画で得る。
+    太字は従来どおり右・下に1pxずらして重ね描きする。
+    """
     x, y = position
     if border_color and border_width > 0:
-        for dx in range(-border_width, border_width + 1):
-            for dy in range(-border_width, border_width + 1):
-                if dx * dx + dy * dy <= border_width * border_width:
-                    draw.text((x + dx, y + dy), text, font=font, fill=border_color)
-    if is_bold:
-        for dx in [0, 1]:
-            for dy in [0, 1]:
-                draw.text((x + dx, y + dy), text, font=font, fill=text_color)
+        # 縁取り+本体を1回で描画（縁取りが先、本体が上）
+        draw.text((x, y), text, font=font, fill=text_color, stroke_width=border_width, stroke_fill=border_color)
     else:
         draw.text((x, y), text, font=font, fill=text_color)
+    if is_bold:
+        for dx, dy in [(1, 0), (0, 1), (1, 1)]:
+            draw.text((x + dx, y + dy), text, font=font, fill=text_color)
 
 
 def get_audio_duration(wav_path):
@@ -650,17 +914,15 @@ def generate_text_image(
     text, font_size, text_color, border_color, border_width, is_bold=False, size=None, align="left"
 ):
     # 指定サイズがない場合は動的に計算 (字幕などの固定幅用)
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import Image, ImageDraw
 
-    font = ImageFont.truetype(FONT_PATH, font_size)
+    font = get_font(FONT_PATH, font_size)
 
     if size:
         W, H = size
     else:
         # 文字数から概算 (または textlength で真面目に計算)
-        dummy_img = Image.new("RGBA", (1, 1))
-        dummy_draw = ImageDraw.Draw(dummy_img)
-        W = int(dummy_draw.textlength(text, font=font) + border_width * 2 + 10)
+        W = int(text_width(font, text) + border_width * 2 + 10)
         H = font_size + border_width * 2 + 10
 
     img = Image.new("RGBA", (W, H), (0, 0, 0, 0))
@@ -668,16 +930,12 @@ def generate_text_image(
 
     # 字幕の折り返し処理 (method='caption' 互換)
     if size and W > 0:
-        import textwrap
-
-        # 日本語全角文字は約font_size分の幅ボーダー分も考慮して安全マージン
-        avg_char_w = font_size * 1.1  # 日本語を考慮（1.0 + マージン0.1）
+        # 実際の文字幅で折り返す（禁則処理あり: 行頭に「、。」」等を置かない）
         available_width = W - (border_width * 2 + 20)  # ボーダーとマージンを除く
-        chars_per_line = max(1, int(available_width / avg_char_w))
-        lines = textwrap.wrap(text, width=chars_per_line)
+        lines = wrap_text(text, font, max(1, available_width))
         y_text = 0
         for line in lines:
-            line_w = draw.textlength(line, font=font)
+            line_w = text_width(font, line)
             x_text = 0 if align == "left" else (W - line_w) / 2
             draw_text_bold_with_border(
                 draw, line, (x_text, y_text), font, text_color, border_color, border_width, is_bold
@@ -689,6 +947,66 @@ def generate_text_image(
     return img
 
 
+# ==========================================
+# プロンプト共通の静的セクション
+# ==========================================
+# 台本素材（YouTube要約+RSS要約）のトークン予算（旧: prompt[:3000] の文字数切り詰め）
+MATERIAL_TOKEN_BUDGET = 3000
+
+CONTENT_PHILOSOPHY = """
+## CONTENT PHILOSOPHY (MANDATORY - apply to ALL dialogue)
+The script must INDIRECTLY stimulate these core human emotions:
+- PRIORITY EMOTION: "損得" (gain/loss) - MORE IMPORTANT than right/wrong, win/lose, fun/boring
+  - Viewers must feel "もっと得したい！" (I want more benefit!) and "絶対に損したくない！" (I absolutely don't want to lose out!)
+- "もっと欲しい" - Even when they have enough, the instinct of "if I can get it, I want it"
+- "安心への渇望" - No matter how much they have, they can never feel fully secure
+- "損失回避" - Fear of missing benefits they're entitled to
+- "優位性欲求" - Wanting to be the one who knows, the one who benefits
+
+CRITICAL CONSTRAINTS:
+- NEVER express these directly or crudely
+- Use INDIRECT phrases: "知らないと損" "実はまだ間に合う" "意外と見落としがち" "これ知ってる人だけ得してる"
+- Let Katsumi and Hiroshi naturally touch on these through their everyday perspective
+- Viewers should feel "this is about ME" and keep watching to the end"""
+
+
+# ==========================================
+# 台本チェック用キーワード（A-D問題防止・品質チェック）
+# TTS読み仮名辞書は src/tts_lexicon.tsv（load_tts_lexiconで読み込み）
+# ==========================================
+# A: 途中エンディングNGワード（最後の2行以外で検出したら削除）
+ENDING_NG_WORDS = [
+    "今日はここまで",
+    "ここまでです",
+    "次回をお楽しみ",
+    "また次回",
+    "また来週",
+    "またね",
+    "さようなら",
+    "バイバイ",
+]
+# D: 挨拶リセットパターン（冒頭以外で検出したら削除）
+GREETING_NG_PATTERNS = ["こんにちは", "皆さん、こんにちは", "今日のニュースです", "本日のニュースは", "ニュースをお届け"]
+# 品質チェック: 損得DNAキーワード
+LOSS_KEYWORDS = ["損", "得", "知らない", "見落とし", "間に合う"]
+
+_script_scanner = None
+
+
+def get_script_scanner():
+    """全チェック共通のキーワードスキャナを返す（プロセス内で1回だけ構築）"""
+    global _script_scanner
+    if _script_scanner is None:
+        _script_scanner = PatternScanner(
+            {
+                "ending_ng": ENDING_NG_WORDS,
+                "greeting_ng": GREETING_NG_PATTERNS,
+                "loss_keyword": LOSS_KEYWORDS,
+            }
+        )
+    return _script_scanner
+
+
 class VideoEngineV4:
     def __init__(self, mode="--test", script_only=False):
         self.mode = mode
@@ -722,29 +1040,18 @@ class VideoEngineV4:
         else:
             self.uploader = None
 
-        # TTS読み仮名辞書（誤読修正）
-        self.tts_reading_dict = {
-            "掛金": "かけきん",
-            "掛け金": "かけきん",
-            "NISA": "ニーサ",
-            "nisa": "ニーサ",
-            "iDeCo": "イデコ",
-            "ideco": "イデコ",
-            "GDP": "ジーディーピー",
-            "NHK": "エヌエイチケー",
-            "板橋": "いたばし",
-            "他人事": "ひとごと",
-            "今日の方": "きょうのかた",
-            "この方": "このかた",
-        }
+        # TTS読み仮名辞書（誤読修正）: src/tts_lexicon.tsv をコンパイル済みで読み込み
+        self.tts_lexicon = load_tts_lexicon()
+        self.tts_reading_dict = self.tts_lexicon.entries
+
+        self._chalk_library = None  # チョーク風イラストのライブラリ（初回使用時に作成）
 
     def _normalize_text_for_tts(self, text):
         """TTS送信前にテキストを正規化（誤読修正 & エラー予防）"""
         original_text = text
 
-        # 1. 誤読修正（既存の辞書）
-        for wrong, correct in self.tts_reading_dict.items():
-            text = text.replace(wrong, correct)
+        # 1. 誤読修正（読み仮名辞書）: 1回の走査で最長一致置換（登録順に依存しない）
+        text = self.tts_lexicon.apply(text)
 
         # 2. エラー予防処理
         # 空白・改行のみの場合は空文字列を返す（後続処理でスキップされる）
@@ -841,21 +1148,25 @@ class VideoEngineV4:
         # 参考YouTubeチャンネルからテーマ関連の動画を取得し、ストーリーを深掘り
         print("===== コンテンツ取得（人間ドキュメンタリー型） =====")
 
+        # 事前収集された素材（python -m src.ingest）があればそれを使い、なければその場で取得する
+        # 事前収集レコードで動画・記事の片方が空なら、空の方だけその場で取得する
+        material = load_material(theme) or {}
+        if material:
+            print(f"[MATERIAL] 事前収集素材を使用（{material['age_hours']:.1f}時間前に収集）")
+
         # Part 1: 参考チャンネルからテーマ関連動画を検索
         print(f"--- Part 1: 参考チャンネルから{theme}ストーリー動画を検索 ---")
-        # YouTube検索でテーマに関連する動画を取得
-        # CHANNEL_THEMEベースでYouTube検索キーワードを動的生成
-        story_keywords = [
-            f"{theme} 暮らし 実態",
-            f"{theme} 生活費",
-            f"{theme} リアル",
-            f"{theme} 節約 日常",
-            f"{theme} 密着",
-            f"{theme} コツ",
-            f"{theme} シニア",
-            f"{theme} 体験談",
-        ]
-        yt_videos = fetch_trending_youtube_videos(keywords=story_keywords, max_videos=8, days=14, min_views=300)
+        yt_videos = material.get("youtube")
+        if not yt_videos:
+            if material:
+                print("[MATERIAL] 事前収集素材に動画なし → その場で取得")
+            yt_videos = fetch_story_videos(theme)
+
+        # 過去回と同じネタの素材は台本生成の前に除く（再生成によるLLM呼び出しの無駄を防ぐ）
+        topic_history = TopicHistory.load()
+        if len(topic_history):
+            print(f"[HISTORY] 過去{len(topic_history)}回分のトピックと照合")
+        yt_videos = topic_history.filter_candidates(yt_videos, "動画")
 
         story_summary = ""
         if yt_videos and len(yt_videos) >= 1:
@@ -865,13 +1176,14 @@ class VideoEngineV4:
 
         # Part 2: RSSでテーマ関連の統計データを取得（チャートデータ用）
         print(f"--- Part 2: {theme}関連統計データ（RSS） ---")
-        rss_articles = fetch_news_from_rss(
-            keywords=[f"{theme} 生活費", f"{theme} 最新", f"シニア {theme}"], max_articles=2
-        )
+        rss_articles = material.get("articles")
+        if not rss_articles:
+            if material:
+                print("[MATERIAL] 事前収集素材に記事なし → その場で取得")
+            rss_articles = fetch_stats_articles(theme)
+        rss_articles = topic_history.filter_candidates(rss_articles, "記事")
         stats_brief = ""
         if rss_articles:
-            for article in rss_articles:
-                article["body"] = scrape_article_text(article["url"])
             stats_brief = summarize_news_for_script(rss_articles, channel_theme=theme)
 
         # Part 3: X(旧Twitter)でリアルタイムの声を取得
@@ -895,21 +1207,12 @@ class VideoEngineV4:
         print(f"===== 第1段階: 構成生成（{group_label}） =====")
 
         # 共通: コンテンツ哲学
-        content_philosophy = """
-## CONTENT PHILOSOPHY (MANDATORY - apply to ALL dialogue)
-The script must INDIRECTLY stimulate these core human emotions:
-- PRIORITY EMOTION: "損得" (gain/loss) - MORE IMPORTANT than right/wrong, win/lose, fun/boring
-  - Viewers must feel "もっと得したい！" (I want more benefit!) and "絶対に損したくない！" (I absolutely don't want to lose out!)
-- "もっと欲しい" - Even when they have enough, the instinct of "if I can get it, I want it"
-- "安心への渇望" - No matter how much they have, they can never feel fully secure
-- "損失回避" - Fear of missing benefits they're entitled to
-- "優位性欲求" - Wanting to be the one who knows, the one who benefits
+        content_philosophy = CONTENT_PHILOSOPHY
 
-CRITICAL CONSTRAINTS:
-- NEVER express these directly or crudely
-- Use INDIRECT phrases: "知らないと損" "実はまだ間に合う" "意外と見落としがち" "これ知ってる人だけ得してる"
-- Let Katsumi and Hiroshi naturally touch on these through their everyday perspective
-- Viewers should feel "this is about ME" and keep watching to the end"""
+        # 素材はトークン予算で切り詰め（文字数ではなくトークン数でコストを管理）
+        structure_builder = PromptBuilder("構成生成")
+        structure_builder.add("content_philosophy", content_philosophy)
+        material_text = structure_builder.add("material", prompt, max_tokens=MATERIAL_TOKEN_BUDGET)
 
         if is_kamishibai:
             # ===== 紙芝居3幕: 構成プロンプト =====
@@ -925,7 +1228,7 @@ Target audience: Japanese elderly women (60-80 years old).
 カツミとヒロシが庶民目線で語り、Xのリアルな声も交えて共感を生む。
 
 ## TODAY'S MATERIAL
-{prompt[:3000]}
+{material_text}
 
 ## YOUR TASK: 紙芝居3幕の構成を作成
 OP(衝撃フック) → 本編(データ解説) → 控え室(エピローグ余韻)
@@ -969,7 +1272,7 @@ The story follows a narrative arc (hero's journey): Background → Challenges 
 カツミ and ヒロシ discuss the topic with honest opinions and data, from the perspective of {self.channel_theme}.
 
 ## TODAY'S STORY MATERIAL (source for creating the person's profile)
-{prompt[:3000]}
+{material_text}
 
 ## YOUR TASK
 Based on the material above, create a compelling profile of 1 person related to {self.channel_theme}:
@@ -999,6 +1302,7 @@ Based on the material above, create a compelling profile of 1 person related to
   ]
 }}
 """
+        structure_builder.log(structure_prompt)
 
         structure_text = call_llm_with_fallback(
             messages=[
@@ -1009,10 +1313,12 @@ Based on the material above, create a compelling profile of 1 person related to
             max_tokens=2000,
             temperature=0.7,
         )
-        # JSON抽出（Llamaモデル対応）
-        structure_text = extract_json_from_text(structure_text)
-        structure = json.loads(structure_text)
-        print(f"構成生成完了: {json.dumps(structure, indent=2, ensure_ascii=False)[:500]}...")
+        # JSON抽出（Llamaモデル対応・途中切れは修復）
+        structure, repairs = parse_llm_json(structure_text)
+        for repair in repairs:
+            print(f"[FIX] 構成JSON修復: {repair}")
+        structure_json = json.dumps(structure, indent=2, ensure_ascii=False)
+        print(f"構成生成完了: {structure_json[:500]}...")
 
         # ----- 第2段階: 詳細台本一括生成 -----
         print("\n===== 第2段階: 詳細台本生成 =====")
@@ -1022,24 +1328,28 @@ Based on the material above, create a compelling profile of 1 person related to
         min_lines = 35  # 最低35行（8分目標）
         data = None
 
-        for attempt in range(10):  # 行数不足なら再生成（最大10回）
-            print(f"--- 台本生成 (試行 {attempt + 1}/10) ---")
-            # 人物プロフィールを構成から取得
-            person_profile = structure.get("person_profile", {})
-            person_json = json.dumps(person_profile, ensure_ascii=False) if person_profile else "{}"
-            stat_data = structure.get("stat_data", [])
-            stat_data_json = json.dumps(stat_data, ensure_ascii=False) if stat_data else "[]"
-
-            if is_kamishibai:
-                # ===== 紙芝居3幕: 詳細台本プロンプト =====
-                # 構成からデータを取得
-                hook_fact = structure.get("hook_fact", "")
-                hook_number = structure.get("hook_number", "")
-                themes = structure.get("themes", [])
-                themes_json = json.dumps(themes, ensure_ascii=False) if themes else "[]"
-                epilogue_dir = structure.get("epilogue_direction", "")
-
-                detail_prompt = f"""
+        # 詳細台本プロンプトは試行ごとに変わらないため、ループの外で1回だけ組み立てる
+        detail_builder = PromptBuilder("詳細台本")
+        detail_builder.add("content_philosophy", content_philosophy)
+        # 人物プロフィールを構成から取得
+        person_profile = structure.get("person_profile", {})
+        person_json = json.dumps(person_profile, ensure_ascii=False) if person_profile else "{}"
+        stat_data = structure.get("stat_data", [])
+        stat_data_json = json.dumps(stat_data, ensure_ascii=False) if stat_data else "[]"
+        detail_builder.add("person_profile", person_json)
+        detail_builder.add("stat_data", stat_data_json)
+
+        if is_kamishibai:
+            # ===== 紙芝居3幕: 詳細台本プロンプト =====
+            # 構成からデータを取得
+            hook_fact = structure.get("hook_fact", "")
+            hook_number = structure.get("hook_number", "")
+            themes = structure.get("themes", [])
+            themes_json = json.dumps(themes, ensure_ascii=False) if themes else "[]"
+            epilogue_dir = structure.get("epilogue_direction", "")
+            detail_builder.add("themes", themes_json)
+
+            detail_prompt = f"""
 Generate a {self.channel_theme} script. This is a KAMISHIBAI (紙芝居) style show with DATA and CHARTS.
 
 CRITICAL: ALL OUTPUT CONTENT MUST BE IN JAPANESE ONLY.
@@ -1118,9 +1428,10 @@ CRITICAL REQUIREMENT - SCRIPT LENGTH:
   ]
 }}
 """
-            else:
-                # ===== ヒーローズジャーニー: 詳細台本プロンプト（現状維持） =====
-                detail_prompt = f"""
+        else:
+            # ===== ヒーローズジャーニー: 詳細台本プロンプト（現状維持） =====
+            detail_builder.add("structure", structure_json)
+            detail_prompt = f"""
 Generate a {self.channel_theme} script. This is a HUMAN DOCUMENTARY show, NOT a news show.
 
 CORE CONCEPT: {self.channel_theme}に関する「慎ましい日常」をリアルに伝えるドキュメンタリー。
@@ -1139,27 +1450,14 @@ CRITICAL REQUIREMENT - SCRIPT LENGTH:
 
 CRITICAL: ALL OUTPUT CONTENT MUST BE IN JAPANESE ONLY.
 Target audience: Japanese elderly women (60-80 years old).
-## CONTENT PHILOSOPHY (MANDATORY - apply to ALL dialogue)
-The script must INDIRECTLY stimulate these core human emotions:
-- PRIORITY EMOTION: "損得" (gain/loss) - MORE IMPORTANT than right/wrong, win/lose, fun/boring
-  - Viewers must feel "もっと得したい！" (I want more benefit!) and "絶対に損したくない！" (I absolutely don't want to lose out!)
-- "もっと欲しい" - Even when they have enough, the instinct of "if I can get it, I want it"
-- "安心への渇望" - No matter how much they have, they can never feel fully secure
-- "損失回避" - Fear of missing benefits they're entitled to
-- "優位性欲求" - Wanting to be the one who knows, the one who benefits
-
-CRITICAL CONSTRAINTS:
-- NEVER express these directly or crudely
-- Use INDIRECT phrases: "知らないと損" "実はまだ間に合う" "意外と見落としがち" "これ知ってる人だけ得してる"
-- Let Katsumi and Hiroshi naturally touch on these through their everyday perspective
-- Viewers should feel "this is about ME" and keep watching to the end
+{content_philosophy}
 
 
 ## PERSON PROFILE (this is who we're talking about today)
 {person_json}
 
 ## STORY STRUCTURE
-{json.dumps(structure, indent=2, ensure_ascii=False)}
+{structure_json}
 
 ## STATISTICAL DATA (for comparison/charts)
 {stat_data_json}
@@ -1304,6 +1602,11 @@ Example flow:
 }}
 """
 
+        detail_builder.log(detail_prompt)
+
+        for attempt in range(10):  # 行数不足なら再生成（最大10回）
+            print(f"--- 台本生成 (試行 {attempt + 1}/10) ---")
+
             raw_text = call_llm_with_fallback(
                 messages=[
                     {
@@ -1316,10 +1619,10 @@ Example flow:
                 max_tokens=16384,
                 temperature=0.8,
             )
-            # JSON抽出（Llamaモデル対応）
-            raw_text = extract_json_from_text(raw_text)
-
-            new_data = json.loads(raw_text)
+            # JSON抽出（Llamaモデル対応・途中切れは最終行を捨てて修復 → 再生成せずに済む）
+            new_data, repairs = parse_llm_json(raw_text)
+            for repair in repairs:
+                print(f"[FIX] 台本JSON修復: {repair}")
             new_script = new_data.get("script", [])
             script_lines = len(new_script)
             print(f"取得: {script_lines}行")
@@ -1352,39 +1655,23 @@ Example flow:
         # ========================================
         print("\n--- 繰り返し除去 ---")
 
-        def similarity_ratio(a: str, b: str) -> float:
-            """2つの文字列の類似度を計算（0.0〜1.0）"""
-            if not a or not b:
-                return 0.0
-            # 共通部分の長さ / 長い方の長さ
-            from difflib import SequenceMatcher
-
-            return SequenceMatcher(None, a, b).ratio()
-
         script = data.get("script", [])
         deduped_script = []
         removed_count = 0
+        # 残した行を類似インデックスに登録し、75%超の類似行があればスキップ（総当たり比較はしない）
+        dedupe_index = SimilarityIndex(threshold=0.75)
 
         for i, line in enumerate(script):
             text = line.get("text", "")
 
             # 最初の行は必ず追加
-            if i == 0:
-                deduped_script.append(line)
+            if i > 0 and dedupe_index.find_similar(text):
+                print(f"[FIX] 繰り返し削除: {text[:40]}...")
+                removed_count += 1
                 continue
 
-            # 全ての既存行と比較して75%以上類似していたらスキップ
-            is_duplicate = False
-            for j in range(len(deduped_script)):
-                prev_text = deduped_script[j].get("text", "")
-                if similarity_ratio(text, prev_text) > 0.75:
-                    print(f"[FIX] 繰り返し削除: {text[:40]}...")
-                    is_duplicate = True
-                    removed_count += 1
-                    break
-
-            if not is_duplicate:
-                deduped_script.append(line)
+            deduped_script.append(line)
+            dedupe_index.add(text)
 
         data["script"] = deduped_script
         print(f"[OK] 繰り返し除去完了: {removed_count}行削除, 残り{len(deduped_script)}行")
@@ -1395,63 +1682,47 @@ Example flow:
         print("\n--- A-D問題防止チェック ---")
         script = data.get("script", [])
         issues_found = []
+        scanner = get_script_scanner()
 
         # A: 途中エンディングNGワード検出（最後の2行以外）
-        ending_ng_words = [
-            "今日はここまで",
-            "ここまでです",
-            "次回をお楽しみ",
-            "また次回",
-            "また来週",
-            "またね",
-            "さようなら",
-            "バイバイ",
-        ]
-        for i, line in enumerate(script[:-2]):  # 最後の2行は除外
+        # D: 挨拶パターン検出（冒頭以外）
+        # A/Dは1行1回の走査で同時に検出・除去する。最長一致で選ぶため
+        # 「皆さん、こんにちは」⊃「こんにちは」の包摂パターンも二重マッチしない
+        for i, line in enumerate(script):
+            active = set()
+            if i < len(script) - 2:  # 最後の2行は除外
+                active.add("ending_ng")
+            if i > 0:  # 最初の行は除外
+                active.add("greeting_ng")
             text = line.get("text", "")
-            for ng in ending_ng_words:
-                if ng in text:
+            hits = scanner.leftmost_longest(
+                [hit for hit in scanner.scan(text) if scanner.categories[hit[2]] & active]
+            )
+            if not hits:
+                continue
+            greeting_removed = False
+            for _, _, word in hits:
+                if "ending_ng" in active and "ending_ng" in scanner.categories[word]:
                     issues_found.append(f"[A] 途中エンディング検出 (行{i + 1}): {text[:30]}...")
-                    # 該当行を削除
-                    script[i]["text"] = text.replace(ng, "")
+                else:
+                    issues_found.append(f"[D] 挨拶リセット検出 (行{i + 1}): {text[:30]}...")
+                    greeting_removed = True
+            text = scanner.apply(text, hits)
+            script[i]["text"] = text.strip() if greeting_removed else text
 
         # B: 本音トーク重複チェック（honne_を含む行同士を比較）
-        honne_lines = [(i, line) for i, line in enumerate(script) if "honne" in str(line.get("marker", ""))]
-        for i, (idx1, line1) in enumerate(honne_lines):
-            for idx2, line2 in honne_lines[i + 1 :]:
-                text1 = line1.get("text", "")
-                text2 = line2.get("text", "")
-                if similarity_ratio(text1, text2) > 0.6:
-                    issues_found.append(
-                        f"[B] 本音重複 (行{idx1 + 1}と行{idx2 + 1}): 類似度{similarity_ratio(text1, text2):.0%}"
-                    )
+        honne_lines = [
+            (i, line.get("text", "")) for i, line in enumerate(script) if "honne" in str(line.get("marker", ""))
+        ]
+        for idx1, idx2, ratio in find_similar_pairs(honne_lines, threshold=0.6):
+            issues_found.append(f"[B] 本音重複 (行{idx1 + 1}と行{idx2 + 1}): 類似度{ratio:.0%}")
 
         # C: ニュース差別化検証（news_を含む行のキーワード重複チェック）
-        news_lines = [(i, line) for i, line in enumerate(script) if "news" in str(line.get("marker", ""))]
-        if len(news_lines) >= 2:
-            for i, (idx1, line1) in enumerate(news_lines):
-                for idx2, line2 in news_lines[i + 1 :]:
-                    text1 = line1.get("text", "")
-                    text2 = line2.get("text", "")
-                    if similarity_ratio(text1, text2) > 0.5:
-                        issues_found.append(
-                            f"[C] ニュース重複 (行{idx1 + 1}と行{idx2 + 1}): 類似度{similarity_ratio(text1, text2):.0%}"
-                        )
-
-        # D: 挨拶パターン検出（冒頭以外）- 長い順に処理し包摂問題を回避
-        # 「皆さん、こんにちは」⊃「こんにちは」なので長い順にマッチ→除去→text更新
-        greeting_ng_patterns = sorted(
-            ["こんにちは", "皆さん、こんにちは", "今日のニュースです", "本日のニュースは", "ニュースをお届け"],
-            key=len,
-            reverse=True,
-        )
-        for i, line in enumerate(script[1:], start=1):  # 最初の行は除外
-            text = line.get("text", "")
-            for pattern in greeting_ng_patterns:
-                if pattern in text:
-                    issues_found.append(f"[D] 挨拶リセット検出 (行{i + 1}): {text[:30]}...")
-                    text = text.replace(pattern, "").strip()  # textを更新して包摂パターンの二重マッチを防止
-            script[i]["text"] = text
+        news_lines = [
+            (i, line.get("text", "")) for i, line in enumerate(script) if "news" in str(line.get("marker", ""))
+        ]
+        for idx1, idx2, ratio in find_similar_pairs(news_lines, threshold=0.5):
+            issues_found.append(f"[C] ニュース重複 (行{idx1 + 1}と行{idx2 + 1}): 類似度{ratio:.0%}")
 
         # 結果表示
         if issues_found:
@@ -1533,6 +1804,9 @@ Example flow:
             ]
         )
 
+        # 使用した素材のURL（アップロード後にトピック履歴へ記録）
+        data["source_urls"] = [m["url"] for m in (yt_videos or []) + (rss_articles or []) if m.get("url")]
+
         # 生成結果を保存 (検証用)
         with open(os.path.join(OUTPUT_DIR, "content.json"), "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
@@ -1563,8 +1837,7 @@ Example flow:
             warnings.append("[ヒロシ不在]")
         # 4. 損得DNAキーワードチェック
         all_text = "".join(line.get("text", "") for line in script)
-        loss_keywords = ["損", "得", "知らない", "見落とし", "間に合う"]
-        if not any(kw in all_text for kw in loss_keywords):
+        if not get_script_scanner().contains_any(all_text, "loss_keyword"):
             warnings.append("[損得DNA未検出]")
         # 5. 冒頭テーマ名チェック
         if script and self.channel_theme not in script[0].get("text", ""):
@@ -1670,6 +1943,8 @@ Example flow:
         Gemini画像生成APIで黒板チョーク風イラストを生成。
         テキストは一切入れない（文字化け防止）。
         中塗りありの手書きチョーク風に統一。
+        生成済み画像はプロンプト別のライブラリ（src/chalk_library.py）から順番に使い、
+        在庫が少ないときだけバックグラウンドで補充する。
 
         Args:
             script: 台本データ（トピック抽出用）
@@ -1704,6 +1979,19 @@ Objects to illustrate: {objects}
 All filled with hand-drawn chalk texture, warm colors (white, yellow, pink, orange, green, light blue).
 Warm, nostalgic, inviting feeling. Simple clear compositions. 16:9 landscape aspect ratio."""
 
+        if self._chalk_library is None:
+            self._chalk_library = ChalkLibrary(self._generate_chalk_image)
+        try:
+            path = self._chalk_library.take(prompt, output_path)
+        except Exception as e:
+            print(f"[WARN] チョーク画像生成失敗: {e}")
+            return None
+        if path:
+            print(f"[OK] チョーク風イラスト: {output_path}")
+        return path
+
+    def _generate_chalk_image(self, prompt):
+        """Gemini画像生成APIでチョーク風イラストを1枚生成（PIL Image、失敗時 None）"""
         try:
             import io
 
@@ -1728,12 +2016,7 @@ Warm, nostalgic, inviting feeling. Simple clear compositions. 16:9 landscape asp
             if response.candidates and response.candidates[0].content.parts:
                 for part in response.candidates[0].content.parts:
                     if part.inline_data and part.inline_data.mime_type.startswith("image/"):
-                        img = Image.open(io.BytesIO(part.inline_data.data))
-                        img = img.resize((640, 360), Image.LANCZOS)
-                        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                        img.save(output_path)
-                        print(f"[OK] チョーク風イラスト生成: {output_path}")
-                        return output_path
+                        return Image.open(io.BytesIO(part.inline_data.data))
 
             print("[WARN] チョーク画像: 画像パーツなし")
             return None
@@ -1752,136 +2035,46 @@ Warm, nostalgic, inviting feeling. Simple clear compositions. 16:9 landscape asp
         """
         print("--- YouTubeサムネイル画像生成中 (v10確定版: 丸キャラ+2行バッジ) ---")
 
-        from PIL import Image, ImageDraw, ImageFont
-
-        out_path = os.path.join(OUTPUT_DIR, "youtube_thumbnail.png")
-        title_lines = title.split("\n")[:2]
-        line1 = title_lines[0] if len(title_lines) > 0 else ""
-        line2 = title_lines[1] if len(title_lines) > 1 else ""
-
-        # ===== 喜怒哀楽の判定 =====
-        emotion_to_mood = {
-            "neutral": "angry", "normal": "angry", "default": "angry",
-            "happy": "happy", "excited": "happy", "guts": "happy",
-            "laugh": "happy", "bakusho": "happy", "smile": "happy",
-            "idea": "info", "hirameki": "info",
-            "surprised": "shocking", "shocked": "shocking",
-            "concerned": "angry", "worried": "angry", "sad": "angry",
-            "tired": "angry", "yareyare": "angry", "fuseru": "angry",
-            "doyon": "angry", "question": "info", "thinking": "info",
-            "henken": "angry", "aogu": "angry", "sukashi": "info",
-        }
-        COLOR_SCHEMES = {
-            "angry": {"bg": (200, 40, 40), "l1c": (255, 255, 255), "l2c": (255, 240, 80), "badge_bg": (30, 30, 30), "oba": "worried", "oji": "worried"},
-            "happy": {"bg": (40, 70, 170), "l1c": (255, 255, 255), "l2c": (255, 220, 50), "badge_bg": (220, 50, 50), "oba": "happy", "oji": "happy"},
-            "alert": {"bg": (230, 170, 30), "l1c": (255, 255, 255), "l2c": (220, 40, 40), "badge_bg": (200, 40, 40), "oba": "surprised", "oji": "surprised"},
-            "info": {"bg": (30, 120, 70), "l1c": (255, 255, 255), "l2c": (255, 240, 80), "badge_bg": (30, 30, 30), "oba": "neutral", "oji": "neutral"},
-            "shocking": {"bg": (90, 40, 150), "l1c": (255, 255, 255), "l2c": (255, 200, 50), "badge_bg": (220, 50, 50), "oba": "surprised", "oji": "surprised"},
-        }
+        best_mood = mood_from_script(script)
+        img = render_thumbnail(title, best_mood, comment)
+        # thumbnails.set が正式に受け付けるのは JPEG/PNG のため既定は JPEG のみ（WEBP は THUMBNAIL_FORMATS で追加）
+        formats = [f.strip() for f in os.environ.get("THUMBNAIL_FORMATS", "JPEG").split(",") if f.strip()]
+        out_path = export_thumbnail(img, os.path.join(OUTPUT_DIR, "youtube_thumbnail"), formats=formats)
+        print(f"[OK] v10サムネイル保存完了: {out_path} (mood: {best_mood})")
+        return out_path
 
-        best_mood = "angry"
-        if script:
-            mood_counts = {}
-            for line_data in script:
-                emo = line_data.get("emotion", "neutral").lower()
-                mood = emotion_to_mood.get(emo, "angry")
-                mood_counts[mood] = mood_counts.get(mood, 0) + 1
-            non_angry = {k: v for k, v in mood_counts.items() if k != "angry"}
-            if non_angry:
-                best_mood = max(non_angry, key=non_angry.get)
-            print(f"[OK] 感情→ムード集計: {mood_counts} -> カラー: {best_mood}")
-
-        scheme = COLOR_SCHEMES[best_mood]
-
-        # ===== サムネイル描画 =====
-        W, H = 1280, 720
-        CHAR_SIZE = 300
-        BADGE_W = int(W * 0.50)
-        BADGE_H = 220
-        L1_Y = int(H * 0.48)
-        L2_Y = int(H * 0.80)
-        MAX_TW = int(W * 0.95)
-
-        img = Image.new("RGB", (W, H), scheme["bg"])
-
-        # キャラ丸切り抜き（背面レイヤー）
-        def load_char_circle(name, pose, size):
-            p = os.path.join("assets", "character_assets", name, f"{name}_{pose}.png")
-            if not os.path.exists(p):
-                return None
-            ci = Image.open(p).convert("RGB")
-            w, h = ci.size
-            s = min(w, h)
-            ci = ci.crop(((w - s) // 2, (h - s) // 2, (w + s) // 2, (h + s) // 2))
-            ci = ci.resize((size, size), Image.LANCZOS)
-            mask = Image.new("L", (size, size), 0)
-            ImageDraw.Draw(mask).ellipse([0, 0, size - 1, size - 1], fill=255)
-            result = ci.convert("RGBA")
-            result.putalpha(mask)
-            return result
-
-        oji = load_char_circle("ojiichan", scheme["oji"], CHAR_SIZE)
-        oba = load_char_circle("obaachan", scheme["oba"], CHAR_SIZE)
-        if oji:
-            img.paste(oji, (5, 5), oji)
-        if oba:
-            img.paste(oba, (W - CHAR_SIZE - 5, 5), oba)
-
-        draw = ImageDraw.Draw(img)
-
-        # フォントサイズ自動調整
-        bold_font_path = "assets/NotoSansCJKjp-Bold.otf"
-        if not os.path.exists(bold_font_path):
-            raise FileNotFoundError(f"太字フォントが見つかりません: {bold_font_path}")
-
-        def fit_font(text, max_width, start_size=260):
-            for sz in range(start_size, 20, -2):
-                f = ImageFont.truetype(bold_font_path, sz)
-                tw = f.getbbox(text)[2] - f.getbbox(text)[0]
-                if tw <= max_width:
-                    return f, sz
-            return ImageFont.truetype(bold_font_path, 20), 20
-
-        # テキスト行1（前面レイヤー、キャラに被ってOK）
-        f1, _ = fit_font(line1, MAX_TW, 240)
-        for dx, dy in [(6, 6), (4, 4)]:
-            draw.text((W // 2 + dx, L1_Y + dy), line1, fill=(0, 0, 0), font=f1, anchor="mm")
-        draw.text((W // 2, L1_Y), line1, fill=scheme["l1c"], font=f1, anchor="mm")
-
-        # テキスト行2
-        f2, _ = fit_font(line2, MAX_TW, 240)
-        for dx, dy in [(6, 6), (4, 4)]:
-            draw.text((W // 2 + dx, L2_Y + dy), line2, fill=(0, 0, 0), font=f2, anchor="mm")
-        draw.text((W // 2, L2_Y), line2, fill=scheme["l2c"], font=f2, anchor="mm")
-
-        # バッジ（最前面、2行化）
-        badge_text = comment if comment else "知らないと損！"
-        bx1, bx2 = W // 2 - BADGE_W // 2, W // 2 + BADGE_W // 2
-        by1 = 5
-        draw.rounded_rectangle([bx1, by1, bx2, by1 + BADGE_H], radius=16, fill=scheme["badge_bg"])
-
-        # バッジテキスト分割（\nがあればそれで、なければ自動）
-        if "\n" in badge_text:
-            badge_lines = badge_text.split("\n")[:2]
-        elif len(badge_text) <= 5:
-            badge_lines = [badge_text]
-        else:
-            mid = len(badge_text) // 2
-            badge_lines = [badge_text[:mid], badge_text[mid:]]
+    def generate_thumbnail_variants(self, titles, script=None, badges=None, moods=None, processes=0):
+        """
+        サムネイルのA/B候補を一括描画し、コンタクトシートを書き出す
 
-        badge_fg = (255, 255, 255)
-        if len(badge_lines) == 1:
-            bf, _ = fit_font(badge_lines[0], int(BADGE_W * 0.90), 150)
-            draw.text((W // 2, by1 + BADGE_H // 2), badge_lines[0], fill=badge_fg, font=bf, anchor="mm")
-        else:
-            bf0, _ = fit_font(badge_lines[0], int(BADGE_W * 0.90), 80)
-            bf1, _ = fit_font(badge_lines[1], int(BADGE_W * 0.90), 80)
-            draw.text((W // 2, by1 + 60), badge_lines[0], fill=badge_fg, font=bf0, anchor="mm")
-            draw.text((W // 2, by1 + 160), badge_lines[1], fill=badge_fg, font=bf1, anchor="mm")
+        タイトル×ムード×バッジの組み合わせを1回の呼び出しで描画する
+        （フォント・キャラスプライト・背景は候補間で共有）。
+        ムード省略時は台本から判定したムード、バッジ省略時は既定のバッジを使う。
 
-        img.save(out_path, quality=95)
-        print(f"[OK] v10サムネイル保存完了: {out_path} (mood: {best_mood})")
-        return out_path
+        Returns:
+            (候補画像パスのリスト, コンタクトシートのパス, 候補のリスト)
+        """
+        print(f"--- サムネイル候補の一括描画（タイトル{len(titles)}件） ---")
+        moods = moods or [mood_from_script(script)]
+        badges = badges or [None]
+        variants = [
+            {"title": title, "mood": mood, "badge": badge} for title in titles for mood in moods for badge in badges
+        ]
+        images = render_variants(variants, processes=processes)
+
+        variant_dir = os.path.join(OUTPUT_DIR, "thumbnail_variants")
+        os.makedirs(variant_dir, exist_ok=True)
+        paths = []
+        for i, (variant, image) in enumerate(zip(variants, images), 1):
+            path = os.path.join(variant_dir, f"variant_{i:02d}.png")
+            image.save(path)
+            paths.append(path)
+
+        labels = [f"{v['mood']} / {v['title'].replace(chr(10), ' ')}" for v in variants]
+        sheet_path = os.path.join(OUTPUT_DIR, "thumbnail_contact_sheet.png")
+        contact_sheet(images, labels).save(sheet_path)
+        print(f"[OK] サムネイル候補{len(paths)}枚 + コンタクトシート保存: {sheet_path}")
+        return paths, sheet_path, variants
     def synthesize_with_edge_tts(self, text, voice, output_path):
         """Edge TTS（Microsoft Neural音声・完全無料）でWAV音声を生成"""
         try:
@@ -2907,7 +3100,7 @@ Warm, nostalgic, inviting feeling. Simple clear compositions. 16:9 landscape asp
     def generate_quiz_intro_video(self, chart_data_list):
         """
         冒頭クイズintro動画を生成（本編chartDataから逆生成）
-        1位のラベル/値を「???」に置換したグラフ画像+TTS音声→ffmpegで動画化
+        1位のラベル/値を「???」に置換した横棒グラフ（バーが伸びるアニメーション）+TTS音声→ffmpegで動画化
 
         Args:
             chart_data_list: 本編のchartDataリスト
@@ -2915,8 +3108,6 @@ Warm, nostalgic, inviting feeling. Simple clear compositions. 16:9 landscape asp
         Returns:
             str: クイズintro動画のパス、失敗時はNone
         """
-        import subprocess
-
         print("--- 冒頭クイズintro動画生成開始 ---")
 
         quiz_path = os.path.join(OUTPUT_DIR, "quiz_intro.mp4")
@@ -2957,112 +3148,9 @@ Warm, nostalgic, inviting feeling. Simple clear compositions. 16:9 landscape asp
 
             question = quiz_poll.get("label", "みんなの声")
 
-            # 3. Pillowでクイズ画像を生成（横棒グラフ）
-            from PIL import Image, ImageDraw, ImageFont
-
-            width, height = 1920, 1080
-            img = Image.new("RGB", (width, height), color=(25, 25, 40))
-            draw = ImageDraw.Draw(img)
-
-            # フォント
-            try:
-                font_path = os.path.join(os.path.dirname(__file__), "..", "remotion", "public", "NotoSansJP-Bold.ttf")
-                if not os.path.exists(font_path):
-                    font_path = "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc"
-                title_font = ImageFont.truetype(font_path, 56)
-                label_font = ImageFont.truetype(font_path, 40)
-                small_font = ImageFont.truetype(font_path, 32)
-            except:
-                title_font = ImageFont.load_default()
-                label_font = title_font
-                small_font = title_font
-
-            # タイトル「あなたは知っていましたか？」
-            draw.text((width // 2, 80), "知らないと損するかも！？", fill=(255, 200, 50), font=title_font, anchor="mt")
-
-            # 質問文
-            draw.text((width // 2, 160), question, fill=(255, 255, 255), font=label_font, anchor="mt")
-
-            # 「1位は何でしょう？」
-            draw.text(
-                (width // 2, 220),
-                "あなたは正解できますか？見逃すと損かも...",
-                fill=(255, 150, 50),
-                font=small_font,
-                anchor="mt",
-            )
-
-            # 棒グラフを描画
-            bar_area_top = 300
-            bar_height = 60
-            bar_gap = 20
-            max_value = max(item.get("value", 1) for item in quiz_items)
-            bar_max_width = 900
-
-            for idx, item in enumerate(quiz_items):
-                y = bar_area_top + idx * (bar_height + bar_gap)
-                value = item.get("value", 0)
-                label = item.get("label", "")
-                bar_width = int((value / max_value) * bar_max_width) if max_value > 0 else 0
-
-                # 順位
-                rank = idx + 1
-                rank_text = f"{rank}位"
-                draw.text((100, y + bar_height // 2), rank_text, fill=(200, 200, 200), font=label_font, anchor="lm")
-
-                # ラベル
-                label_color = (255, 200, 50) if label == "？？？" else (255, 255, 255)
-                draw.text((200, y + bar_height // 2), label, fill=label_color, font=label_font, anchor="lm")
-
-                # バー
-                bar_left = 550
-                bar_color = (255, 100, 100) if label == "？？？" else (100, 150, 255)
-                if label == "？？？":
-                    # 1位のバーは点線風（推測を促す）
-                    for bx in range(0, bar_width, 20):
-                        segment_w = min(12, bar_width - bx)
-                        draw.rectangle(
-                            [bar_left + bx, y, bar_left + bx + segment_w, y + bar_height], fill=(255, 100, 100, 150)
-                        )
-                else:
-                    draw.rectangle([bar_left, y, bar_left + bar_width, y + bar_height], fill=bar_color)
-
-                # 値
-                value_text = f"{value}%" if value <= 100 else f"{value:,}"
-                if label != "？？？":
-                    draw.text(
-                        (bar_left + bar_width + 20, y + bar_height // 2),
-                        value_text,
-                        fill=(200, 200, 200),
-                        font=small_font,
-                        anchor="lm",
-                    )
-                else:
-                    draw.text(
-                        (bar_left + bar_width + 20, y + bar_height // 2),
-                        "??%",
-                        fill=(255, 200, 50),
-                        font=small_font,
-                        anchor="lm",
-                    )
-
-            # 「正解は本編で！」
-            draw.text(
-                (width // 2, height - 120),
-                "答えを知らないと損するかも...最後まで見てね！",
-                fill=(255, 200, 50),
-                font=title_font,
-                anchor="mt",
-            )
-
-            # 出典
-            subtitle = quiz_poll.get("subtitle", "")
-            if subtitle:
-                draw.text((width // 2, height - 50), subtitle, fill=(150, 150, 150), font=small_font, anchor="mt")
-
-            quiz_img_path = os.path.join(OUTPUT_DIR, "quiz_intro.png")
-            img.save(quiz_img_path)
-            print(f"[OK] クイズ画像生成: {quiz_img_path}")
+            # 3. クイズ用の横棒グラフ（レイアウト・静止レイヤーを確定。フレームは動画化時に描画）
+            chart = QuizChart(question, quiz_items, quiz_poll.get("subtitle", ""))
+            print(f"[OK] クイズグラフ準備: {len(quiz_items)}項目（アニメーション{chart.anim_seconds:.1f}秒）")
 
             # 4. TTS音声生成
             quiz_text = f"ねえちょっと、これ知らないと損するかもよ？{question}で、1位は何だと思います？答えを知らないままだと...損しちゃうかも。最後まで見てくださいね！"
@@ -3112,46 +3200,20 @@ Warm, nostalgic, inviting feeling. Simple clear compositions. 16:9 landscape asp
             video_duration = max(audio_duration + 1.0, 5.0)
             print(f"[OK] クイズ音声: {audio_duration:.2f}秒 → 動画: {video_duration:.2f}秒")
 
-            # 6. ffmpegで画像+音声→動画
-            cmd = [
-                "ffmpeg",
-                "-y",
-                "-loop",
-                "1",
-                "-i",
-                quiz_img_path,
-                "-i",
-                quiz_audio_path,
-                "-c:v",
-                "libx264",
-                "-tune",
-                "stillimage",
-                "-c:a",
-                "aac",
-                "-b:a",
-                "128k",
-                "-pix_fmt",
-                "yuv420p",
-                "-t",
-                str(video_duration),
-                "-shortest",
-                quiz_path,
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            # 6. グラフのアニメーションを raw RGB で ffmpeg に流し込み、音声と合わせて動画化
+            ok, stderr = write_chart_video(chart, quiz_audio_path, quiz_path, video_duration)
 
-            if result.returncode != 0:
-                print(f"[ERR] クイズ動画ffmpeg失敗: {result.stderr[:200]}")
+            if not ok:
+                print(f"[ERR] クイズ動画ffmpeg失敗: {stderr[:200]}")
                 return None
 
             print(f"[OK] クイズintro動画生成完了: {quiz_path}")
 
-            # 一時ファイル削除
-            for temp in [quiz_img_path, quiz_audio_path]:
-                if os.path.exists(temp):
-                    try:
-                        os.remove(temp)
-                    except:
-                        pass
+            # 一時音声ファイル削除
+            try:
+                os.remove(quiz_audio_path)
+            except OSError:
+                pass
 
             return quiz_path
 
@@ -3449,7 +3511,7 @@ feel "人間って簡単には生きていけないよね...でも頑張ろう"
 ## 本編の台本 (この人の人生について語った内容)
 {main_script_text}
 
-{get_character_settings()}
+（キャラクター設定はプロンプト冒頭の「キャラクター設定」を参照）
 
 ## BACKSTAGE CONCEPT: 人間の生き様を振り返る哲学トーク
 収録が終わった控室。本編では「この人は月○万円で暮らしてる」「統計的には〜」と
@@ -3555,13 +3617,15 @@ Example:
                 ],
                 max_tokens=3072,
                 temperature=0.9,
+                # キャラクター設定は静的プレフィックスとして先頭に置く（コンテキストキャッシュ対象）
+                static_prefix=static_section("character_settings", get_character_settings),
             )
 
-            match = re.search(r"\[[\s\S]*\]", text)
-            if match:
-                script = json.loads(match.group())
-                print(f"[OK] 控室台本生成: {len(script)}行")
-                return script
+            script, repairs = parse_llm_json(text, expect="array")
+            for repair in repairs:
+                print(f"[FIX] 控室台本JSON修復: {repair}")
+            print(f"[OK] 控室台本生成: {len(script)}行")
+            return script
 
         except Exception as e:
             print(f"[WARN] 控室台本AI生成失敗: {e}")
@@ -3640,50 +3704,35 @@ Example:
         """
         import subprocess
 
-        from PIL import Image
-
         print("--- エンディング動画生成開始 (ffmpeg版) ---")
 
         ending_duration = 5.0  # 5秒
         ending_path = os.path.join(OUTPUT_DIR, "ending.mp4")
 
         try:
-            # 1. 背景画像を作成
-            bg_path = "assets/background.png"
-            if os.path.exists(bg_path):
-                bg_img = Image.open(bg_path).convert("RGBA")
-                bg_img = bg_img.resize(self.res)
-            else:
-                bg_img = Image.new("RGBA", self.res, (255, 200, 200, 255))
+            # 1. 背景画像（サイズ合わせ済みをプロセス内で共有）
+            bg_img = load_background("assets/background.png", self.res, (255, 200, 200))
 
             # 2. キャラクター画像を合成
             katsumi_path = "assets/katsumi_smile.png"
             hiroshi_path = "assets/hiroshi_smile.png"
 
             if os.path.exists(katsumi_path) and os.path.exists(hiroshi_path):
-                katsumi_img = Image.open(katsumi_path).convert("RGBA")
-                hiroshi_img = Image.open(hiroshi_path).convert("RGBA")
-
                 char_height = 350
-                katsumi_img = katsumi_img.resize(
-                    (int(katsumi_img.width * char_height / katsumi_img.height), char_height)
-                )
-                hiroshi_img = hiroshi_img.resize(
-                    (int(hiroshi_img.width * char_height / hiroshi_img.height), char_height)
-                )
+                katsumi_layer = load_layer(katsumi_path, height=char_height)
+                hiroshi_layer = load_layer(hiroshi_path, height=char_height)
 
                 katsumi_x = 200
-                hiroshi_x = self.res[0] - hiroshi_img.width - 200
+                hiroshi_x = self.res[0] - hiroshi_layer.width - 200
                 char_y = self.res[1] // 2 - char_height // 2 + 50
 
-                bg_img.paste(katsumi_img, (katsumi_x, char_y), katsumi_img)
-                bg_img.paste(hiroshi_img, (hiroshi_x, char_y), hiroshi_img)
+                bg_img = composite(bg_img, [(katsumi_layer, (katsumi_x, char_y)), (hiroshi_layer, (hiroshi_x, char_y))])
 
             # 3. テキスト描画なし（背景画像とキャラクターのみ）
             # テキストは控室パートで言うので、エンディングは映像のみ
 
             ending_img_path = os.path.join(OUTPUT_DIR, "ending_frame.png")
-            bg_img.convert("RGB").save(ending_img_path)
+            bg_img.save(ending_img_path)
 
             # 4. 無音で動画化（テキストなし・音声なし）
 
@@ -3813,6 +3862,16 @@ Example:
             news_summary = content.get("summary", "")
             thumbnail_title = self.generate_thumbnail_title(news_summary)
             youtube_thumb_path = self.generate_youtube_thumbnail(thumbnail_title, script=content.get("script"))
+            if os.environ.get("THUMBNAIL_VARIANTS") == "1":
+                # A/B比較用: 同じタイトルを全ムードで一括描画してコンタクトシートにまとめる（投稿には使わない）
+                try:
+                    self.generate_thumbnail_variants(
+                        [thumbnail_title],
+                        moods=list(COLOR_SCHEMES),
+                        processes=int(os.environ.get("THUMBNAIL_PROCESSES", "0")),
+                    )
+                except Exception as e:
+                    print(f"[WARN] サムネイル候補の一括描画に失敗（スキップ）: {e}")
 
             # 3.5 チョーク風イラスト画像生成（Remotion左側表示用）
             print("\n[3.5/10] チョーク風イラスト生成")
@@ -3996,6 +4055,13 @@ Example:
                         print(f"[OK] upload_result.json 書き出し完了")
                     except Exception as e:
                         print(f"[WARN] upload_result.json 書き出し失敗: {e}")
+
+                    # トピック履歴に追記（次回以降、同じネタの素材を除外するため）
+                    try:
+                        TopicHistory.load().record(content, content.get("source_urls", []), video_id)
+                        print("[OK] トピック履歴に追記")
+                    except Exception as e:
+                        print(f"[WARN] トピック履歴の追記失敗: {e}")
                 else:
                     print(f"[ERR] 動画ファイル生成完了（アップロード失敗）: {video_path}")
                     print("[ERR] YouTube アップロードに失敗しました。ワークフローを失敗として終了します。")
@@ -4021,6 +4087,9 @@ Example:
             traceback.print_exc()
             print("=" * 60)
             raise
+        finally:
+            if self._chalk_library is not None:
+                self._chalk_library.wait(REFILL_WAIT_SECONDS)
 
 
 def main():
@@ -0,0 +1,135 @@
+"""
+プロンプト組み立て・トークン予算管理
+
+- 静的セクション（キャラクター設定など、組み立てに処理が要るもの）はプロセス内で1回だけ組み立ててキャッシュ
+- セクションごとのトークン数を概算してログに出す（どこがコストを食っているか見えるようにする）
+- 素材テキストは文字数ではなくトークン予算で切り詰める
+- 静的プレフィックスが十分大きく、同じプロセスで2回以上使う場合は Gemini のコンテキストキャッシュを使う
+  （1回しか使わないプレフィックスは、キャッシュ作成・保持のコストの方が高いため通常送信）
+"""
+
+import hashlib
+import re
+
+# CJK（ひらがな・カタカナ・漢字・全角記号）は概ね1文字1トークン、それ以外は約4文字1トークン
+_CJK_RE = re.compile(r"[\u3000-\u30ff\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+ASCII_CHARS_PER_TOKEN = 4
+
+# Geminiのコンテキストキャッシュ最小トークン数（これ未満は通常送信）
+CONTEXT_CACHE_MIN_TOKENS = 4096
+CONTEXT_CACHE_TTL = "900s"
+CONTEXT_CACHE_MIN_USES = 2  # 同じプレフィックスをこの回数目に使うときからキャッシュする
+
+_static_sections = {}  # 名前 -> 組み立て済みテキスト
+_context_caches = {}  # (APIキーのハッシュ, モデル, プレフィックスのハッシュ) -> キャッシュ名
+_context_cache_disabled = False
+_prefix_uses = {}  # プレフィックスのハッシュ -> このプロセスで使った回数
+
+
+def estimate_tokens(text):
+    """トークン数の概算（APIを呼ばずに日本語/英語混在テキストを見積もる）"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk
+    return cjk + (other + ASCII_CHARS_PER_TOKEN - 1) // ASCII_CHARS_PER_TOKEN
+
+
+def truncate_to_token_budget(text, max_tokens):
+    """トークン予算内に収まるよう末尾を切り詰める（可能なら行の切れ目で切る）"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0
+    cut = len(text)
+    for pos, ch in enumerate(text):
+        used += 1 if _CJK_RE.match(ch) else 1 / ASCII_CHARS_PER_TOKEN
+        if used > max_tokens:
+            cut = pos
+            break
+    newline = text.rfind("\n", 0, cut)
+    if newline > cut // 2:
+        cut = newline
+    return text[:cut].rstrip()
+
+
+def static_section(name, builder):
+    """静的セクションを1回だけ組み立ててキャッシュする（2回目以降は同じ文字列を返す）"""
+    if name not in _static_sections:
+        _static_sections[name] = builder()
+    return _static_sections[name]
+
+
+class PromptBuilder:
+    """セクション単位でプロンプトを組み立て、トークン内訳をログに出す
+
+    Args:
+        label: ログ表示用の名前（例: "構成生成"）
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.sections = []  # [(名前, テキスト)]
+
+    def add(self, name, text, max_tokens=None):
+        """セクションを追加する（max_tokens指定時はトークン予算で切り詰め）"""
+        if max_tokens is not None:
+            original = estimate_tokens(text)
+            text = truncate_to_token_budget(text, max_tokens)
+            trimmed = estimate_tokens(text)
+            if trimmed < original:
+                print(f"[PROMPT] {self.label}/{name}: {original}→{trimmed}トークンに切り詰め（予算{max_tokens}）")
+        self.sections.append((name, text))
+        return text
+
+    def token_report(self):
+        """{セクション名: 概算トークン数}"""
+        return {name: estimate_tokens(text) for name, text in self.sections}
+
+    def log(self, prompt):
+        report = self.token_report()
+        breakdown = ", ".join(f"{name}={tokens}" for name, tokens in report.items())
+        print(f"[PROMPT] {self.label}: 約{estimate_tokens(prompt)}トークン ({breakdown})")
+
+
+def get_context_cache(client, api_key, model, prefix_text):
+    """静的プレフィックスのコンテキストキャッシュを取得/作成してキャッシュ名を返す
+
+    プレフィックスが小さい・APIが未対応・作成失敗の場合は None（呼び出し側で通常送信する）。
+    """
+    if _context_cache_disabled or estimate_tokens(prefix_text) < CONTEXT_CACHE_MIN_TOKENS:
+        return None
+
+    prefix_hash = hashlib.sha256(prefix_text.encode("utf-8")).hexdigest()
+    _prefix_uses[prefix_hash] = _prefix_uses.get(prefix_hash, 0) + 1
+    if _prefix_uses[prefix_hash] < CONTEXT_CACHE_MIN_USES:
+        return None
+
+    key = (hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16], model, prefix_hash)
+    if key in _context_caches:
+        return _context_caches[key]
+
+    try:
+        from google.genai import types as genai_types
+
+        cache = client.caches.create(
+            model=model,
+            config=genai_types.CreateCachedContentConfig(
+                contents=[prefix_text],
+                display_name=f"static-prefix-{key[2][:12]}",
+                ttl=CONTEXT_CACHE_TTL,
+            ),
+        )
+        _context_caches[key] = cache.name
+        print(f"[OK] コンテキストキャッシュ作成: {cache.name} (約{estimate_tokens(prefix_text)}トークン)")
+        return cache.name
+    except Exception as e:
+        # 未対応モデル・権限なし等 → このプロセスでは以後試さない
+        disable_context_cache(e)
+        return None
+
+
+def disable_context_cache(reason):
+    """このプロセスではコンテキストキャッシュを使わない（以後は通常送信）"""
+    global _context_cache_disabled
+    _context_cache_disabled = True
+    print(f"[WARN] コンテキストキャッシュ使用不可（通常送信で続行）: {reason}")
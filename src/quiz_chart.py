@@ -0,0 +1,231 @@
+"""
+冒頭クイズの横棒グラフ描画（アニメーション付き、ffmpegへ直接パイプ）
+
+レイアウト（フォント・文字位置・バーの最終幅）は最初に1回だけ計算し、
+動かない要素（背景・見出し・質問文・順位・ラベル・出典）は静止レイヤー1枚にまとめて描いておく。
+各フレームは静止レイヤーのコピーにバーと値を描くだけなので、1080pでも1フレーム数ミリ秒で済む。
+フレームはPNGを経由せず raw RGB のまま ffmpeg の標準入力へ流し、
+アニメーション終了後の静止部分は ffmpeg 側（tpad）で最終フレームを複製する。
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from functools import lru_cache
+
+from PIL import ImageDraw, ImageFont
+
+from src.font_registry import get_font
+from src.layer_compositor import solid_background
+
+WIDTH, HEIGHT = 1920, 1080
+BG_COLOR = (25, 25, 40)
+HIDDEN_LABEL = "？？？"
+
+BAR_AREA_TOP = 300
+BAR_HEIGHT = 60
+BAR_GAP = 20
+BAR_LEFT = 550
+BAR_MAX_WIDTH = 900
+LABEL_LEFT = 200
+RANK_LEFT = 100
+
+ANIM_SECONDS = 1.2  # バーが伸びきるまでの時間
+STAGGER_SECONDS = 0.12  # バーごとの開始の遅れ
+FPS = 30
+
+
+def default_font_path():
+    font_path = os.path.join(os.path.dirname(__file__), "..", "remotion", "public", "NotoSansJP-Bold.ttf")
+    if not os.path.exists(font_path):
+        font_path = "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc"
+    return font_path
+
+
+def _fonts(font_path):
+    """(title, label, small)。読めなければデフォルトフォント"""
+    try:
+        return get_font(font_path, 56), get_font(font_path, 40), get_font(font_path, 32)
+    except Exception:
+        default = ImageFont.load_default()
+        return default, default, default
+
+
+@lru_cache(maxsize=4)
+def _base_layer(font_path, width=WIDTH, height=HEIGHT):
+    """全クイズ共通の背景+固定文言（見出し・煽り文・締めの一言）"""
+    title_font, _, small_font = _fonts(font_path)
+    img = solid_background((width, height), BG_COLOR).copy()
+    draw = ImageDraw.Draw(img)
+    draw.text((width // 2, 80), "知らないと損するかも！？", fill=(255, 200, 50), font=title_font, anchor="mt")
+    draw.text(
+        (width // 2, 220), "あなたは正解できますか？見逃すと損かも...", fill=(255, 150, 50), font=small_font, anchor="mt"
+    )
+    draw.text(
+        (width // 2, height - 120),
+        "答えを知らないと損するかも...最後まで見てね！",
+        fill=(255, 200, 50),
+        font=title_font,
+        anchor="mt",
+    )
+    return img
+
+
+def _ease_out(p):
+    return 1 - (1 - p) ** 3
+
+
+class QuizChart:
+    """クイズ用の横棒グラフ（レイアウトと静止レイヤーは生成時に確定）
+
+    Args:
+        question: 質問文
+        items: [{"label", "value"}]（表示順。1位は label が HIDDEN_LABEL）
+        subtitle: 出典
+    """
+
+    def __init__(self, question, items, subtitle="", font_path=None):
+        self.font_path = font_path or default_font_path()
+        _, self.label_font, self.small_font = _fonts(self.font_path)
+
+        max_value = max((item.get("value", 1) for item in items), default=1)
+        self.bars = []
+        for idx, item in enumerate(items):
+            value = item.get("value", 0)
+            label = item.get("label", "")
+            hidden = label == HIDDEN_LABEL
+            self.bars.append(
+                {
+                    "y": BAR_AREA_TOP + idx * (BAR_HEIGHT + BAR_GAP),
+                    "label": label,
+                    "hidden": hidden,
+                    "width": int((value / max_value) * BAR_MAX_WIDTH) if max_value > 0 else 0,
+                    "value_text": "??%" if hidden else (f"{value}%" if value <= 100 else f"{value:,}"),
+                }
+            )
+
+        # 静止レイヤー: 共通背景 + 質問文・順位・ラベル・出典
+        self.static = _base_layer(self.font_path).copy()
+        draw = ImageDraw.Draw(self.static)
+        draw.text((WIDTH // 2, 160), question, fill=(255, 255, 255), font=self.label_font, anchor="mt")
+        for rank, bar in enumerate(self.bars, 1):
+            cy = bar["y"] + BAR_HEIGHT // 2
+            draw.text((RANK_LEFT, cy), f"{rank}位", fill=(200, 200, 200), font=self.label_font, anchor="lm")
+            label_color = (255, 200, 50) if bar["hidden"] else (255, 255, 255)
+            draw.text((LABEL_LEFT, cy), bar["label"], fill=label_color, font=self.label_font, anchor="lm")
+        if subtitle:
+            draw.text((WIDTH // 2, HEIGHT - 50), subtitle, fill=(150, 150, 150), font=self.small_font, anchor="mt")
+
+        self.anim_seconds = ANIM_SECONDS + STAGGER_SECONDS * max(0, len(self.bars) - 1)
+
+    def frame(self, t):
+        """t秒時点のフレーム（t >= anim_seconds で最終形）"""
+        img = self.static.copy()
+        draw = ImageDraw.Draw(img)
+        for idx, bar in enumerate(self.bars):
+            p = min(1.0, max(0.0, (t - idx * STAGGER_SECONDS) / ANIM_SECONDS))
+            width = int(bar["width"] * _ease_out(p))
+            y = bar["y"]
+            if bar["hidden"]:
+                # 1位のバーは点線風（推測を促す）
+                for bx in range(0, width, 20):
+                    segment_w = min(12, width - bx)
+                    draw.rectangle([BAR_LEFT + bx, y, BAR_LEFT + bx + segment_w, y + BAR_HEIGHT], fill=(255, 100, 100))
+            elif width > 0:
+                draw.rectangle([BAR_LEFT, y, BAR_LEFT + width, y + BAR_HEIGHT], fill=(100, 150, 255))
+            if p > 0:
+                value_color = (255, 200, 50) if bar["hidden"] else (200, 200, 200)
+                draw.text(
+                    (BAR_LEFT + width + 20, y + BAR_HEIGHT // 2),
+                    bar["value_text"],
+                    fill=value_color,
+                    font=self.small_font,
+                    anchor="lm",
+                )
+        return img
+
+    def frames(self, fps=FPS):
+        """アニメーション区間のフレームを raw RGB バイト列で順に返す（最後は最終形）"""
+        count = int(self.anim_seconds * fps) + 1
+        for i in range(count):
+            yield self.frame(i / fps).tobytes()
+
+
+def write_chart_video(chart, audio_path, out_path, duration, fps=FPS, timeout=60):
+    """グラフのアニメーションを ffmpeg の標準入力へ流し、音声と合わせて動画にする
+
+    アニメーション後は最終フレームを ffmpeg 側で複製して duration 秒まで伸ばす。
+    書き込み開始から timeout 秒で終わらなければ ffmpeg を止める（標準入力への書き込みで詰まった場合も含む）。
+
+    Returns:
+        (成功したか, ffmpegのエラー出力)
+    """
+    hold = max(0.0, duration - chart.anim_seconds)
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-s",
+        f"{WIDTH}x{HEIGHT}",
+        "-r",
+        str(fps),
+        "-i",
+        "-",
+        "-i",
+        audio_path,
+        "-vf",
+        f"tpad=stop_mode=clone:stop_duration={hold:.3f}",
+        "-c:v",
+        "libx264",
+        "-c:a",
+        "aac",
+        "-b:a",
+        "128k",
+        "-pix_fmt",
+        "yuv420p",
+        "-t",
+        str(duration),
+        out_path,
+    ]
+    deadline = time.monotonic() + timeout
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        proc.kill()
+
+    # stderr は一時ファイルへ（パイプだとフレーム書き込み中に溢れて詰まるため）
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=err)
+        watchdog = threading.Timer(timeout, _kill)
+        watchdog.start()
+        try:
+            try:
+                for frame in chart.frames(fps):
+                    proc.stdin.write(frame)
+            except BrokenPipeError:
+                pass  # ffmpeg側が先に終了（エラー内容は stderr で確認）
+            finally:
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+            try:
+                proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                _kill()
+                proc.wait()
+        finally:
+            watchdog.cancel()
+        err.seek(0)
+        stderr = err.read().decode("utf-8", errors="replace")
+    if timed_out.is_set():
+        stderr = f"ffmpegが{timeout}秒以内に終わらないため中断\n{stderr}"
+    return proc.returncode == 0 and not timed_out.is_set(), stderr
@@ -0,0 +1,140 @@
+"""
+台本行の類似検出インデックス（繰り返し除去・A-D問題防止チェック共通）
+
+文字n-gram（shingle）の転置インデックスで候補行を絞り込み、
+文字頻度による上限値で枝刈りしてから SequenceMatcher.ratio() で最終判定する。
+閾値の意味は従来の「全行と SequenceMatcher 総当たり」と同じで、
+共通のn-gramを1つも持たない行同士（全ての文字の間に別の文字が挟まる等）以外は同じ結果になる。
+ただし短文（SHORT_TEXT_LEN 文字以下、「え？」と「え！？」等）はn-gramを共有しにくいため、
+短文が関わる組み合わせだけは長さで絞った上で総当たりで比較する。
+"""
+
+from collections import Counter
+from difflib import SequenceMatcher
+
+SHORT_TEXT_LEN = 3  # これ以下の長さの行は n-gram に頼らず総当たりで比較する
+
+
+def similarity_ratio(a, b):
+    """2つの文字列の類似度を計算（0.0〜1.0）"""
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def char_shingles(text, n=2):
+    """文字n-gramの集合（n文字未満の短文はテキスト自体を1要素とする）"""
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+class SimilarityIndex:
+    """追加済みテキストとの類似行を高速に探すインデックス
+
+    - 転置インデックス（shingle → 行ID）で共通shingleを持つ行だけを候補にする
+    - 長さ比と文字頻度の共通数から ratio() の上限を計算し、閾値に届かない候補は捨てる
+      （どちらも SequenceMatcher.ratio() の厳密な上限なので、ここでの取りこぼしはない）
+    - 生き残った候補だけ SequenceMatcher で実測する
+    """
+
+    def __init__(self, threshold=0.75, n=2):
+        self.threshold = threshold
+        self.n = n
+        self._texts = []
+        self._keys = []
+        self._counters = []
+        self._postings = {}  # shingle -> [行ID, ...]
+        self._by_length = {}  # 長さ -> [行ID, ...]（短文との総当たり比較用）
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, text, key=None):
+        """テキストを登録する（keyは検出時に返す識別子。省略時は登録順の番号）"""
+        idx = len(self._texts)
+        self._texts.append(text)
+        self._keys.append(idx if key is None else key)
+        self._counters.append(Counter(text))
+        for sh in char_shingles(text, self.n):
+            self._postings.setdefault(sh, []).append(idx)
+        self._by_length.setdefault(len(text), []).append(idx)
+        return idx
+
+    def _candidates(self, text, threshold):
+        """共通shingleが多い順に候補の行IDを返す（短文が関わる組み合わせは共通shingleが無くても含める）"""
+        shared = Counter()
+        for sh in char_shingles(text, self.n):
+            for idx in self._postings.get(sh, ()):
+                shared[idx] += 1
+        candidates = [idx for idx, _ in shared.most_common()]
+
+        # 短文同士はn-gramを共有しないことがある → 長さ比の上限で届き得る長さの行を全て候補にする
+        q = len(text)
+        for length, ids in self._by_length.items():
+            if q > SHORT_TEXT_LEN and length > SHORT_TEXT_LEN:
+                continue
+            if 2.0 * min(q, length) / (q + length) <= threshold:
+                continue
+            candidates.extend(idx for idx in ids if idx not in shared)
+        return candidates
+
+    def _ratio_if_above(self, text, counter, idx, threshold):
+        """閾値を超える場合のみ ratio を返す（超えなければ None）"""
+        other = self._texts[idx]
+        total = len(text) + len(other)
+        if not total:
+            return None
+        # 上限1: 長さ比（一致文字数は短い方の長さを超えない）
+        if 2.0 * min(len(text), len(other)) / total <= threshold:
+            return None
+        # 上限2: 文字頻度の共通数（SequenceMatcher.quick_ratio と同じ上限）
+        common = sum((counter & self._counters[idx]).values())
+        if 2.0 * common / total <= threshold:
+            return None
+        ratio = similarity_ratio(text, other)
+        return ratio if ratio > threshold else None
+
+    def find_similar(self, text, threshold=None):
+        """閾値を超えて類似する登録済みテキストを1件探す
+
+        Returns:
+            (key, 類似度) / 見つからなければ None
+        """
+        matches = self.find_all_similar(text, threshold, first_only=True)
+        return matches[0] if matches else None
+
+    def find_all_similar(self, text, threshold=None, first_only=False):
+        """閾値を超えて類似する登録済みテキストを全て返す（登録順）
+
+        Returns:
+            [(key, 類似度), ...]
+        """
+        if not text:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        counter = Counter(text)
+        matches = []
+        for idx in self._candidates(text, threshold):
+            ratio = self._ratio_if_above(text, counter, idx, threshold)
+            if ratio is not None:
+                matches.append((idx, ratio))
+                if first_only:
+                    break
+        matches.sort()
+        return [(self._keys[idx], ratio) for idx, ratio in matches]
+
+
+def find_similar_pairs(items, threshold):
+    """(key, text) のリストから閾値を超える類似ペアを列挙する（B/Cチェック用）
+
+    Returns:
+        [(先のkey, 後のkey, 類似度), ...]
+    """
+    index = SimilarityIndex(threshold=threshold)
+    pairs = []
+    for key, text in items:
+        for prev_key, ratio in index.find_all_similar(text):
+            pairs.append((prev_key, key, ratio))
+        index.add(text, key)
+    return pairs
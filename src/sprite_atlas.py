@@ -0,0 +1,173 @@
+"""
+キャラクター丸切り抜きスプライトのアトラス（サムネイル用）
+
+assets/character_assets/{キャラ}/{キャラ}_{ポーズ}.png を「中央正方形切り抜き → リサイズ → 円形マスク」した
+スプライトを、サイズごとに1枚のアトラス画像（output/cache/sprites/circle_{サイズ}.png）にまとめて保存する。
+セルは (キャラ, ポーズ) を初めて使うときに1枚ずつ作るため、冷えた状態でも実際に使う素材しか読み込まない。
+素材ファイルのハッシュが記録と同じ限りセルを使い回し、変わったセルだけ作り直す。
+ハッシュはファイルの (mtime, サイズ) が前回と同じなら再計算しない。
+セル位置と素材ハッシュの索引はアトラスPNG自体のテキストチャンクに埋め込み、一時ファイル経由で置き換えるため、
+画像と索引が食い違った状態（別の書き込みの画像と索引の組み合わせ）は保存されない。
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from PIL import Image, ImageDraw
+from PIL.PngImagePlugin import PngInfo
+
+from src.local_store import CACHE_DIR
+
+CHARACTER_ASSET_DIR = os.path.join("assets", "character_assets")
+SPRITE_DIR = os.path.join(CACHE_DIR, "sprites")
+ATLAS_COLUMNS = 8
+INDEX_CHUNK = "sprite_atlas_index"  # 索引を埋め込むPNGテキストチャンクのキー
+
+_atlases = {}  # サイズ -> SpriteAtlas
+_atlas_lock = threading.Lock()
+_read_only = False  # True ならセルを追加してもメモリ上だけで使い、ファイルには書かない
+
+
+def _file_hash(path, previous):
+    """ファイルのsha256（(mtime, サイズ) が前回記録と同じなら記録済みの値を使う）"""
+    st = os.stat(path)
+    stat_key = [st.st_mtime_ns, st.st_size]
+    if previous and previous.get("stat") == stat_key:
+        return previous["hash"], stat_key
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest(), stat_key
+
+
+def make_circle_sprite(path, size):
+    """画像を中央で正方形に切り抜き、size×sizeに縮小して円形マスクをかける"""
+    ci = Image.open(path).convert("RGB")
+    w, h = ci.size
+    s = min(w, h)
+    ci = ci.crop(((w - s) // 2, (h - s) // 2, (w + s) // 2, (h + s) // 2))
+    ci = ci.resize((size, size), Image.LANCZOS)
+    mask = Image.new("L", (size, size), 0)
+    ImageDraw.Draw(mask).ellipse([0, 0, size - 1, size - 1], fill=255)
+    result = ci.convert("RGBA")
+    result.putalpha(mask)
+    return result
+
+
+class SpriteAtlas:
+    """1サイズ分の丸切り抜きスプライトをまとめたアトラス（セルは初回使用時に追加）"""
+
+    def __init__(self, size, asset_dir=CHARACTER_ASSET_DIR):
+        self.size = size
+        self.asset_dir = asset_dir
+        self.image_path = os.path.join(SPRITE_DIR, f"circle_{size}.png")
+        self.cells = {}  # "キャラ/ポーズ" -> (x, y)
+        self.sources = {}  # "キャラ/ポーズ" -> {"hash", "stat"}
+        self.image = None
+        self._sprites = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.image_path):
+            return
+        try:
+            with Image.open(self.image_path) as stored:
+                stored.load()
+                index = json.loads(stored.text.get(INDEX_CHUNK, "{}"))
+                image = stored.convert("RGBA")
+        except (OSError, ValueError) as e:
+            print(f"[WARN] スプライトアトラス読み込み失敗（作り直し）: {e}")
+            return
+        if index.get("size") != self.size:
+            return
+        self.image = image
+        self.cells = {k: tuple(v) for k, v in index.get("cells", {}).items()}
+        self.sources = index.get("sources", {})
+
+    def source_path(self, name, pose):
+        return os.path.join(self.asset_dir, name, f"{name}_{pose}.png")
+
+    def _cell_position(self, key):
+        """key のセル位置（新規なら末尾に確保し、必要ならアトラス画像を広げる）"""
+        if key in self.cells:
+            return self.cells[key]
+        i = len(self.cells)
+        x, y = (i % ATLAS_COLUMNS) * self.size, (i // ATLAS_COLUMNS) * self.size
+        width = min(i + 1, ATLAS_COLUMNS) * self.size
+        height = (i // ATLAS_COLUMNS + 1) * self.size
+        if self.image is None or self.image.width < width or self.image.height < height:
+            grown = Image.new("RGBA", (max(width, self.image.width if self.image else 0), height), (0, 0, 0, 0))
+            if self.image is not None:
+                grown.paste(self.image, (0, 0))
+            self.image = grown
+        self.cells[key] = (x, y)
+        return x, y
+
+    def _save(self):
+        """画像と索引を1つのPNGとして一時ファイル経由で書き出す
+
+        複数プロセスが同時に書いた場合は最後の1つが残る（消えた側のセルは次回作り直されるだけ）。
+        """
+        if _read_only:
+            return
+        index = {"size": self.size, "cells": self.cells, "sources": self.sources}
+        info = PngInfo()
+        info.add_text(INDEX_CHUNK, json.dumps(index, ensure_ascii=False))
+        tmp_path = f"{self.image_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(SPRITE_DIR, exist_ok=True)
+            self.image.save(tmp_path, format="PNG", pnginfo=info)
+            os.replace(tmp_path, self.image_path)
+        except OSError as e:
+            print(f"[WARN] スプライトアトラス保存失敗（メモリ上のみで続行）: {e}")
+
+    def get(self, name, pose):
+        """丸切り抜きスプライト（RGBA）。素材が無ければ None"""
+        key = f"{name}/{pose}"
+        if key in self._sprites:
+            return self._sprites[key]
+        path = self.source_path(name, pose)
+        if not os.path.exists(path):
+            return None
+
+        previous = self.sources.get(key)
+        file_hash, stat_key = _file_hash(path, previous)
+        fingerprint = {"hash": file_hash, "stat": stat_key}
+        if key in self.cells and previous and previous["hash"] == file_hash:
+            if previous != fingerprint:
+                # 内容は同じでmtimeだけ変わった → 次回のハッシュ計算を省くため記録だけ更新
+                self.sources[key] = fingerprint
+                self._save()
+        else:
+            try:
+                sprite = make_circle_sprite(path, self.size)
+            except Exception as e:
+                print(f"[WARN] スプライト作成失敗: {path}: {e}")
+                return None
+            x, y = self._cell_position(key)
+            self.image.paste(sprite, (x, y))
+            self.sources[key] = fingerprint
+            self._save()
+            print(f"[OK] キャラスプライト追加: {key} ({self.size}px)")
+
+        x, y = self.cells[key]
+        self._sprites[key] = self.image.crop((x, y, x + self.size, y + self.size))
+        return self._sprites[key]
+
+
+def get_circle_sprite(name, pose, size):
+    """(キャラ, ポーズ, サイズ) の丸切り抜きスプライトを返す（アトラスはサイズごとにプロセス内で1回だけ読み込み）"""
+    with _atlas_lock:
+        if size not in _atlases:
+            _atlases[size] = SpriteAtlas(size)
+        return _atlases[size].get(name, pose)
+
+
+def set_read_only(read_only=True):
+    """アトラスをファイルに書かないモードにする（プロセスプールのワーカーで使う）
+
+    ワーカーごとにセルを追加・保存すると、同じ位置に別のポーズを置いた画像が互いに上書きし合うため、
+    保存は親プロセスだけが行う。
+    """
+    global _read_only
+    _read_only = read_only
@@ -0,0 +1,116 @@
+"""
+台本チェック用の複数キーワード同時検索（Aho-Corasick法）
+
+NGワード・挨拶パターン・損得キーワードなど、台本チェック用のカテゴリ付きキーワードを
+1つのオートマトンにまとめ、1行を1回走査するだけで全ヒットを得る。
+TTS読み仮名辞書（src/tts_lexicon.py）は同じ PatternScanner クラスを使うが、
+辞書ファイルごとに別のインスタンスを作る（台本チェックのオートマトンとは共有しない）。
+キーワード数が数千件に増えても1行あたりの走査コストはほぼ変わらない。
+"""
+
+from collections import deque
+
+
+class PatternScanner:
+    """カテゴリ付きキーワードを1パスで検出するAho-Corasickオートマトン
+
+    Args:
+        patterns: {カテゴリ名: キーワードのリスト}
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]  # 状態 -> {文字: 次状態}
+        self._fail = [0]
+        self._out = [[]]  # 状態 -> [この状態で終わるキーワード, ...]（failリンク先の分も含む）
+        self.categories = {}  # キーワード -> {カテゴリ, ...}
+
+        for category, words in patterns.items():
+            for word in words:
+                if not word:
+                    continue
+                if word not in self.categories:
+                    self.categories[word] = set()
+                    self._insert(word)
+                self.categories[word].add(category)
+        self._build_fail_links()
+
+    def __len__(self):
+        return len(self.categories)
+
+    def _insert(self, word):
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(word)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text, category=None):
+        """全ヒットを返す（重なりあり）
+
+        Returns:
+            [(開始位置, 終了位置, キーワード), ...]（終了位置の昇順）
+        """
+        hits = []
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for word in out[state]:
+                if category is None or category in self.categories[word]:
+                    hits.append((pos + 1 - len(word), pos + 1, word))
+        return hits
+
+    @staticmethod
+    def leftmost_longest(hits):
+        """重なるヒットから「左優先・同位置なら最長」で重ならないヒットだけを選ぶ"""
+        selected = []
+        last_end = 0
+        for start, end, word in sorted(hits, key=lambda h: (h[0], -(h[1] - h[0]))):
+            if start >= last_end:
+                selected.append((start, end, word))
+                last_end = end
+        return selected
+
+    def contains_any(self, text, category):
+        """カテゴリのキーワードを1つでも含むか"""
+        return bool(self.scan(text, category))
+
+    @staticmethod
+    def apply(text, hits, replacements=None):
+        """選択済み（重ならない）ヒットを置換する（replacements=Noneなら削除）"""
+        if not hits:
+            return text
+        parts = []
+        pos = 0
+        for start, end, word in hits:
+            parts.append(text[pos:start])
+            if replacements is not None:
+                parts.append(replacements.get(word, word))
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    def replace(self, text, replacements, category=None):
+        """最長一致優先でキーワードを置換する（辞書の登録順に依存しない）"""
+        hits = self.leftmost_longest(self.scan(text, category))
+        return self.apply(text, hits, replacements)
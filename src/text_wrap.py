@@ -0,0 +1,73 @@
+"""
+日本語の行分割（字幕・テロップ用）
+
+文字ごとの送り幅（フォント・サイズ単位でメモ化）を累積して実際の描画幅で折り返し、
+禁則処理（行頭に句読点・閉じ括弧・小書き仮名・長音を置かない / 行末に開き括弧を置かない）を行う。
+英数字の単語は途中で切らず、直前の空白で折り返す。
+1文字ずつ1回走査するだけで、行数が最小になる分割位置（貪欲法）が決まる。
+"""
+
+from src.font_registry import text_width
+
+# 行頭禁則（行の先頭に来てはいけない文字）
+NO_LINE_START = set(
+    "、。，．,.・：；:;？！?!)）]］}｝」』】〕〉》〙〗〟’”"
+    "ゝゞヽヾ々ー～…‥"
+    "ぁぃぅぇぉっゃゅょゎゕゖァィゥェォッャュョヮヵヶㇰㇱㇲㇳㇴㇵㇶㇷㇸㇹㇺㇻㇼㇽㇾㇿ"
+)
+# 行末禁則（行の末尾に来てはいけない文字）
+NO_LINE_END = set("(（[［{｛「『【〔〈《〘〖〝‘“")
+MAX_KINSOKU_SHIFT = 3  # 禁則で折り返し位置を前へずらす最大文字数
+
+
+def _is_word_char(ch):
+    return ch.isascii() and (ch.isalnum() or ch in "'-_")
+
+
+def char_advance(font, ch):
+    """1文字の送り幅（font_registry でメモ化）"""
+    return text_width(font, ch)
+
+
+def _break_position(line, pos):
+    """line[:pos] / line[pos:] で分割する位置を禁則・単語境界に合わせて前へずらす"""
+    best = pos
+    # 英単語の途中なら直前の空白まで戻す
+    if 0 < best < len(line) and _is_word_char(line[best - 1]) and _is_word_char(line[best]):
+        space = line.rfind(" ", 0, best)
+        if space > 0:
+            best = space + 1
+    # 行頭禁則・行末禁則（追い出し）
+    for _ in range(MAX_KINSOKU_SHIFT):
+        if best <= 1:
+            break
+        if best < len(line) and line[best] in NO_LINE_START:
+            best -= 1
+        elif line[best - 1] in NO_LINE_END:
+            best -= 1
+        else:
+            break
+    if best <= 0 or (best < len(line) and line[best] in NO_LINE_START) or line[best - 1] in NO_LINE_END:
+        return pos  # ずらしきれない場合は元の位置で切る
+    return best
+
+
+def wrap_text(text, font, max_width):
+    """描画幅 max_width(px) に収まるよう行分割する（改行文字は強制改行）"""
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        width = 0.0
+        for ch in paragraph:
+            advance = char_advance(font, ch)
+            if line and width + advance > max_width:
+                pos = _break_position(line + ch, len(line))
+                head, line = (line + ch)[:pos], (line + ch)[pos:]
+                lines.append(head.rstrip())
+                line = line.lstrip(" ")
+                width = sum(char_advance(font, c) for c in line)
+            else:
+                line += ch
+                width += advance
+        lines.append(line)
+    return lines
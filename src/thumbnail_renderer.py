@@ -0,0 +1,173 @@
+"""
+YouTubeサムネイルの描画（v10確定版: 丸切り抜きキャラ+2行バッジ+テキスト前面レイヤー）
+
+1枚描画（generate_youtube_thumbnail）とA/B候補の一括描画（render_variants）で同じ描画処理を使う。
+フォント（font_registry）・キャラスプライト（sprite_atlas）・ムードごとの背景+キャラのベースレイヤー（layer_compositor）は
+プロセス内で共有するため、候補をN枚描いても重い処理は1回ずつで済む。
+一括描画は processes>1 でプロセスプールに分散でき、結果をコンタクトシート1枚にまとめて比較できる。
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+from src.font_registry import fit_font, get_font
+from src.layer_compositor import Layer, composite, solid_background
+from src.sprite_atlas import get_circle_sprite, set_read_only
+
+BOLD_FONT_PATH = os.path.join("assets", "NotoSansCJKjp-Bold.otf")
+DEFAULT_BADGE_TEXT = "知らないと損！"
+
+W, H = 1280, 720
+CHAR_SIZE = 300
+BADGE_W = int(W * 0.50)
+BADGE_H = 220
+L1_Y = int(H * 0.48)
+L2_Y = int(H * 0.80)
+MAX_TW = int(W * 0.95)
+
+# ===== 喜怒哀楽の判定 =====
+EMOTION_TO_MOOD = {
+    "neutral": "angry", "normal": "angry", "default": "angry",
+    "happy": "happy", "excited": "happy", "guts": "happy",
+    "laugh": "happy", "bakusho": "happy", "smile": "happy",
+    "idea": "info", "hirameki": "info",
+    "surprised": "shocking", "shocked": "shocking",
+    "concerned": "angry", "worried": "angry", "sad": "angry",
+    "tired": "angry", "yareyare": "angry", "fuseru": "angry",
+    "doyon": "angry", "question": "info", "thinking": "info",
+    "henken": "angry", "aogu": "angry", "sukashi": "info",
+}
+COLOR_SCHEMES = {
+    "angry": {"bg": (200, 40, 40), "l1c": (255, 255, 255), "l2c": (255, 240, 80), "badge_bg": (30, 30, 30), "oba": "worried", "oji": "worried"},
+    "happy": {"bg": (40, 70, 170), "l1c": (255, 255, 255), "l2c": (255, 220, 50), "badge_bg": (220, 50, 50), "oba": "happy", "oji": "happy"},
+    "alert": {"bg": (230, 170, 30), "l1c": (255, 255, 255), "l2c": (220, 40, 40), "badge_bg": (200, 40, 40), "oba": "surprised", "oji": "surprised"},
+    "info": {"bg": (30, 120, 70), "l1c": (255, 255, 255), "l2c": (255, 240, 80), "badge_bg": (30, 30, 30), "oba": "neutral", "oji": "neutral"},
+    "shocking": {"bg": (90, 40, 150), "l1c": (255, 255, 255), "l2c": (255, 200, 50), "badge_bg": (220, 50, 50), "oba": "surprised", "oji": "surprised"},
+}
+
+
+def mood_from_script(script):
+    """台本の感情（emotion）からサムネイルのムードを決める（angry以外で最多のもの）"""
+    best_mood = "angry"
+    if script:
+        mood_counts = {}
+        for line_data in script:
+            emo = line_data.get("emotion", "neutral").lower()
+            mood = EMOTION_TO_MOOD.get(emo, "angry")
+            mood_counts[mood] = mood_counts.get(mood, 0) + 1
+        non_angry = {k: v for k, v in mood_counts.items() if k != "angry"}
+        if non_angry:
+            best_mood = max(non_angry, key=non_angry.get)
+        print(f"[OK] 感情→ムード集計: {mood_counts} -> カラー: {best_mood}")
+    return best_mood
+
+
+def split_badge_text(badge_text):
+    """バッジテキスト分割（\\nがあればそれで、なければ自動）"""
+    if "\n" in badge_text:
+        return badge_text.split("\n")[:2]
+    if len(badge_text) <= 5:
+        return [badge_text]
+    mid = len(badge_text) // 2
+    return [badge_text[:mid], badge_text[mid:]]
+
+
+@lru_cache(maxsize=32)
+def _sprite_layer(name, pose):
+    sprite = get_circle_sprite(name, pose, CHAR_SIZE)
+    return Layer(sprite) if sprite else None
+
+
+@lru_cache(maxsize=len(COLOR_SCHEMES))
+def _base_layer(mood):
+    """背景色+キャラ丸切り抜き（背面レイヤー）。ムードごとに1回だけ合成する"""
+    scheme = COLOR_SCHEMES[mood]
+    return composite(
+        solid_background((W, H), scheme["bg"]),
+        [
+            (_sprite_layer("ojiichan", scheme["oji"]), (5, 5)),
+            (_sprite_layer("obaachan", scheme["oba"]), (W - CHAR_SIZE - 5, 5)),
+        ],
+    )
+
+
+def render_thumbnail(title, mood="angry", badge_text=None):
+    """サムネイル1枚を描画して返す（RGB）"""
+    if not os.path.exists(BOLD_FONT_PATH):
+        raise FileNotFoundError(f"太字フォントが見つかりません: {BOLD_FONT_PATH}")
+    scheme = COLOR_SCHEMES[mood]
+    title_lines = title.split("\n")[:2]
+    line1 = title_lines[0] if len(title_lines) > 0 else ""
+    line2 = title_lines[1] if len(title_lines) > 1 else ""
+
+    img = _base_layer(mood).copy()
+    draw = ImageDraw.Draw(img)
+
+    # テキスト行1（前面レイヤー、キャラに被ってOK）
+    f1, _ = fit_font(BOLD_FONT_PATH, line1, MAX_TW, 240)
+    for dx, dy in [(6, 6), (4, 4)]:
+        draw.text((W // 2 + dx, L1_Y + dy), line1, fill=(0, 0, 0), font=f1, anchor="mm")
+    draw.text((W // 2, L1_Y), line1, fill=scheme["l1c"], font=f1, anchor="mm")
+
+    # テキスト行2
+    f2, _ = fit_font(BOLD_FONT_PATH, line2, MAX_TW, 240)
+    for dx, dy in [(6, 6), (4, 4)]:
+        draw.text((W // 2 + dx, L2_Y + dy), line2, fill=(0, 0, 0), font=f2, anchor="mm")
+    draw.text((W // 2, L2_Y), line2, fill=scheme["l2c"], font=f2, anchor="mm")
+
+    # バッジ（最前面、2行化）
+    bx1, bx2 = W // 2 - BADGE_W // 2, W // 2 + BADGE_W // 2
+    by1 = 5
+    draw.rounded_rectangle([bx1, by1, bx2, by1 + BADGE_H], radius=16, fill=scheme["badge_bg"])
+
+    badge_lines = split_badge_text(badge_text or DEFAULT_BADGE_TEXT)
+    badge_fg = (255, 255, 255)
+    if len(badge_lines) == 1:
+        bf, _ = fit_font(BOLD_FONT_PATH, badge_lines[0], int(BADGE_W * 0.90), 150)
+        draw.text((W // 2, by1 + BADGE_H // 2), badge_lines[0], fill=badge_fg, font=bf, anchor="mm")
+    else:
+        bf0, _ = fit_font(BOLD_FONT_PATH, badge_lines[0], int(BADGE_W * 0.90), 80)
+        bf1, _ = fit_font(BOLD_FONT_PATH, badge_lines[1], int(BADGE_W * 0.90), 80)
+        draw.text((W // 2, by1 + 60), badge_lines[0], fill=badge_fg, font=bf0, anchor="mm")
+        draw.text((W // 2, by1 + 160), badge_lines[1], fill=badge_fg, font=bf1, anchor="mm")
+    return img
+
+
+def _render_variant(variant):
+    return render_thumbnail(variant["title"], variant.get("mood", "angry"), variant.get("badge"))
+
+
+def render_variants(variants, processes=0):
+    """候補（{"title", "mood", "badge"} のリスト）をまとめて描画する
+
+    processes>1 ならプロセスプールで並列描画する（各プロセスでフォント・スプライトを1回ずつ読み込む）。
+    使うムードの背景+キャラは先に親プロセスで作ってアトラスに保存し、ワーカーのアトラスは読み取り専用にする。
+    """
+    if processes and processes > 1 and len(variants) > 1:
+        for mood in {v.get("mood", "angry") for v in variants}:
+            _base_layer(mood)
+        with ProcessPoolExecutor(max_workers=min(processes, len(variants)), initializer=set_read_only) as pool:
+            return list(pool.map(_render_variant, variants))
+    return [_render_variant(v) for v in variants]
+
+
+def contact_sheet(images, labels=None, columns=3, scale=0.5, label_font_path=BOLD_FONT_PATH):
+    """サムネイル候補を縮小して並べた一覧画像を作る（番号・ラベル付き）"""
+    tw, th = int(W * scale), int(H * scale)
+    label_h = 56
+    gap = 16
+    columns = max(1, min(columns, len(images)))
+    rows = (len(images) + columns - 1) // columns
+    sheet = Image.new("RGB", (columns * (tw + gap) + gap, rows * (th + label_h + gap) + gap), (24, 24, 24))
+    draw = ImageDraw.Draw(sheet)
+    font = get_font(label_font_path, 28) if os.path.exists(label_font_path) else None
+    for i, image in enumerate(images):
+        x = gap + (i % columns) * (tw + gap)
+        y = gap + (i // columns) * (th + label_h + gap)
+        sheet.paste(image.resize((tw, th), Image.LANCZOS), (x, y))
+        label = f"#{i + 1}" + (f" {labels[i]}" if labels else "")
+        draw.text((x, y + th + 10), label, fill=(240, 240, 240), font=font)
+    return sheet
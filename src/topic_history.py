@@ -0,0 +1,116 @@
+"""
+過去回のトピック履歴（同じネタの使い回し防止）
+
+アップロード済みエピソードのタイトル・要点（summary / key_points）・出典URLを
+output/topic_history.jsonl（upload_result.json と同じ場所）に1行1エピソードで追記し、
+次回以降の素材候補（動画・記事）を台本生成の前にふるい落とす。
+
+照合は正規化URLの集合と、タイトル・要点の SimilarityIndex（文字n-gramの転置インデックス）で行うため、
+履歴が数千回分に増えても1候補あたりのコストはほぼ変わらない。
+"""
+
+import json
+import os
+import re
+import time
+
+from src.article_cache import canonical_url
+from src.feed_fetcher import normalize_title
+from src.similarity_index import SimilarityIndex
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output", "topic_history.jsonl")
+TITLE_SIMILARITY_THRESHOLD = 0.6  # 過去回タイトル・要点との類似度がこれを超えたら同じネタとみなす
+MIN_FACT_CHARS = 8  # これより短い要点は照合に使わない
+
+_EPISODE_PREFIX_RE = re.compile(r"^【#\d+】")
+_SENTENCE_SPLIT_RE = re.compile(r"[。！？!?\n]+")
+
+
+def _normalize(text):
+    return normalize_title(_EPISODE_PREFIX_RE.sub("", text or ""))
+
+
+class TopicHistory:
+    """過去エピソードの照合用インデックス"""
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.episodes = []
+        self.urls = {}  # 正規化URL -> エピソードのタイトル
+        self.index = SimilarityIndex(threshold=TITLE_SIMILARITY_THRESHOLD)
+
+    @classmethod
+    def load(cls, path=HISTORY_PATH):
+        history = cls(path)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        history._add(json.loads(line))
+                    except ValueError:
+                        continue
+        return history
+
+    def __len__(self):
+        return len(self.episodes)
+
+    def _add(self, episode):
+        self.episodes.append(episode)
+        title = episode.get("title", "")
+        for url in episode.get("source_urls", []):
+            if url:
+                self.urls[canonical_url(url)] = title
+        for text in [title, *episode.get("key_facts", [])]:
+            key = _normalize(text)
+            if len(key) >= MIN_FACT_CHARS or (text == title and key):
+                self.index.add(key, title)
+
+    def match(self, candidate):
+        """候補が過去回と同じネタなら理由を返す（該当なしは None）"""
+        url = candidate.get("url", "")
+        if url and canonical_url(url) in self.urls:
+            return f"出典URLが過去回と同じ（{self.urls[canonical_url(url)][:30]}）"
+        key = _normalize(candidate.get("title", ""))
+        found = self.index.find_similar(key) if key else None
+        if found:
+            return f"過去回と類似{found[1]:.0%}（{found[0][:30]}）"
+        return None
+
+    def filter_candidates(self, candidates, label="候補"):
+        """過去回と同じネタの候補を除く（全て該当した場合は素材切れを避けるため元のまま返す）"""
+        if not candidates or not self.episodes:
+            return candidates
+        kept = []
+        for candidate in candidates:
+            reason = self.match(candidate)
+            if reason:
+                print(f"  [HISTORY] {label}除外: {candidate.get('title', '')[:40]}... ← {reason}")
+            else:
+                kept.append(candidate)
+        if not kept:
+            print(f"  [WARN] {label}が全て過去回と重複。素材切れを避けるため除外せずに続行")
+            return candidates
+        return kept
+
+    def record(self, content, source_urls=(), video_id=""):
+        """アップロード済みエピソードを履歴に追記する"""
+        summary = content.get("summary", "")
+        key_facts = [s.strip() for s in _SENTENCE_SPLIT_RE.split(summary) if s.strip()]
+        key_facts += [p for p in content.get("key_points", []) if isinstance(p, str)]
+        references = [s.get("url", "") for s in content.get("reference_sources", []) if isinstance(s, dict)]
+        urls = list(source_urls) + references
+        episode = {
+            "title": content.get("title", ""),
+            "date": time.strftime("%Y-%m-%d %H:%M"),
+            "video_id": video_id,
+            "key_facts": key_facts,
+            "source_urls": [u for u in dict.fromkeys(urls) if u],
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(episode, ensure_ascii=False) + "\n")
+        self._add(episode)
+        return episode
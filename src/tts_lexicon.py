@@ -0,0 +1,75 @@
+"""
+TTS読み仮名辞書（発音レキシコン）
+
+辞書ファイル（表記<TAB>読み）を読み込み、最長一致置換用のトライ（Aho-Corasick）にコンパイルする。
+コンパイル結果はファイルハッシュでキャッシュするため、1行ごとに呼んでも再構築は起きない。
+置換は1回の走査で行うので、登録語が数千件に増えても1行あたりの処理時間はほぼ変わらない。
+"""
+
+import hashlib
+import os
+
+from src.text_scanner import PatternScanner
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_lexicon.tsv")
+
+_lexicon_cache = {}  # ファイルハッシュ -> TTSLexicon
+_stat_cache = {}  # パス -> ((mtime_ns, size), ファイルハッシュ)
+
+
+class TTSLexicon:
+    """コンパイル済みの読み仮名辞書"""
+
+    def __init__(self, entries, file_hash=""):
+        self.entries = entries
+        self.file_hash = file_hash
+        self.scanner = PatternScanner({"tts_reading": entries.keys()})
+
+    def __len__(self):
+        return len(self.entries)
+
+    def apply(self, text):
+        """最長一致優先で読み仮名に置換する（辞書の登録順に依存しない）"""
+        return self.scanner.replace(text, self.entries)
+
+
+def parse_lexicon(raw_text):
+    """辞書ファイルの内容を {表記: 読み} に変換する（#コメント・空行は無視）"""
+    entries = {}
+    for line_no, line in enumerate(raw_text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split("\t")
+        if len(parts) < 2 or not parts[0].strip() or not parts[1].strip():
+            print(f"[WARN] TTS辞書の形式エラー（行{line_no}）: {line[:40]}")
+            continue
+        entries[parts[0].strip()] = parts[1].strip()
+    return entries
+
+
+def load_tts_lexicon(path=LEXICON_PATH):
+    """辞書ファイルを読み込んでコンパイル済み辞書を返す（ファイルハッシュでキャッシュ）
+
+    ファイルが無い場合は空の辞書を返す（TTSは辞書なしで続行できる）。
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        print(f"[WARN] TTS辞書ファイルが見つかりません: {path}")
+        return TTSLexicon({})
+
+    stat_key = (st.st_mtime_ns, st.st_size)
+    cached = _stat_cache.get(path)
+    if cached and cached[0] == stat_key and cached[1] in _lexicon_cache:
+        return _lexicon_cache[cached[1]]
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    file_hash = hashlib.sha256(raw).hexdigest()
+    _stat_cache[path] = (stat_key, file_hash)
+    if file_hash not in _lexicon_cache:
+        lexicon = TTSLexicon(parse_lexicon(raw.decode("utf-8")), file_hash)
+        _lexicon_cache[file_hash] = lexicon
+        print(f"[OK] TTS辞書コンパイル: {len(lexicon)}語 ({os.path.basename(path)}, {file_hash[:8]})")
+    return _lexicon_cache[file_hash]
@@ -0,0 +1,202 @@
+"""
+YouTube Data API v3 クライアント（quota管理 + レスポンスキャッシュ）
+
+- APIキーごとの推定消費quotaを太平洋時間の日付単位でローカルに記録し、残りが多いキーから使う
+  （quotaのリセットは太平洋時間の0時）
+- 403（quota超過）を受けたキーはその日は使い切った扱いにして、別のキーで再試行する
+- search はパラメータ単位、videos は動画ID単位でレスポンスをキャッシュし、
+  TTL内の再実行ではAPIを呼ばない。TTL切れの search はETagで再検証する
+- 記録ファイルにはAPIキーそのものではなくハッシュを保存する
+"""
+
+import hashlib
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.http_client import get_session
+from src.local_store import JsonStore
+
+API_BASE = "https://www.googleapis.com/youtube/v3"
+DAILY_QUOTA = int(os.environ.get("YOUTUBE_DAILY_QUOTA", "10000"))  # 1キーあたりの1日の上限
+QUOTA_COSTS = {"search": 100, "videos": 1}  # 1リクエストあたりの消費quota
+CACHE_TTL = {"search": 6 * 3600, "videos": 3 * 3600}  # 秒
+CACHE_MAX_AGE = 2 * 86400  # TTL切れでもETag再検証用に残しておく期間（秒）
+QUOTA_EXCEEDED_REASONS = {"quotaExceeded", "dailyLimitExceeded", "rateLimitExceeded"}
+VIDEOS_BATCH_SIZE = 50  # Videos APIの1リクエストあたりの最大ID数
+
+
+def pacific_today():
+    """quotaの集計日（太平洋時間の日付）"""
+    try:
+        from zoneinfo import ZoneInfo
+
+        tz = ZoneInfo("America/Los_Angeles")
+    except Exception:
+        tz = timezone(timedelta(hours=-8))  # tzdataが無い環境では標準時で近似
+    return datetime.now(tz).strftime("%Y-%m-%d")
+
+
+def _key_id(api_key):
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class QuotaAccountant:
+    """APIキーごとの推定消費quotaを日付単位で記録する"""
+
+    def __init__(self, store=None, daily_quota=DAILY_QUOTA):
+        self.store = store or JsonStore("youtube_quota.json")
+        self.daily_quota = daily_quota
+
+    def _usage(self):
+        """今日の {キーID: 消費quota}（日付が変わっていればリセット）"""
+        data = self.store.data
+        today = pacific_today()
+        if data.get("day") != today:
+            data.clear()
+            data.update({"day": today, "used": {}})
+        return data["used"]
+
+    def remaining(self, api_key):
+        with self.store.lock:
+            return self.daily_quota - self._usage().get(_key_id(api_key), 0)
+
+    def pick_key(self, api_keys, cost, exclude=()):
+        """残りquotaが最も多いキーを返す（同じ残量ならランダム。足りるキーが無ければ None）"""
+        with self.store.lock:
+            candidates = [k for k in api_keys if k not in exclude and self.remaining(k) >= cost]
+            if not candidates:
+                return None
+            best = max(self.remaining(k) for k in candidates)
+            return random.choice([k for k in candidates if self.remaining(k) == best])
+
+    def spend(self, api_key, cost):
+        with self.store.lock:
+            used = self._usage()
+            key_id = _key_id(api_key)
+            used[key_id] = used.get(key_id, 0) + cost
+            self.store.save()
+
+    def mark_exhausted(self, api_key):
+        """403（quota超過）を受けたキーを今日は使い切った扱いにする"""
+        with self.store.lock:
+            self._usage()[_key_id(api_key)] = self.daily_quota
+            self.store.save()
+
+    def summary(self, api_keys):
+        return ", ".join(f"{_key_id(k)[:6]}:残{self.remaining(k)}" for k in api_keys)
+
+
+class YouTubeDataClient:
+    """quota管理とレスポンスキャッシュ付きの YouTube Data API クライアント
+
+    Args:
+        api_keys: 使用するAPIキーのリスト
+    """
+
+    def __init__(self, api_keys, session=None, accountant=None, cache_store=None):
+        self.api_keys = list(api_keys)
+        self.session = session or get_session()
+        self.accountant = accountant or QuotaAccountant()
+        self.cache = cache_store or JsonStore("youtube_responses.json")
+        self._prune_cache()
+
+    def _prune_cache(self):
+        """古いキャッシュを削除する"""
+        now = time.time()
+        with self.cache.lock:
+            for endpoint in QUOTA_COSTS:
+                entries = self.cache.data.setdefault(endpoint, {})
+                for key in [k for k, v in entries.items() if now - v.get("fetched_at", 0) > CACHE_MAX_AGE]:
+                    del entries[key]
+
+    def _request(self, endpoint, params, etag=None):
+        """quotaの残っているキーでGETする
+
+        Returns:
+            (ステータスコード, JSON, ETag) / 全キーが使えなければ None
+        """
+        cost = QUOTA_COSTS[endpoint]
+        tried = set()
+        while True:
+            api_key = self.accountant.pick_key(self.api_keys, cost, exclude=tried)
+            if api_key is None:
+                print(f"  [WARN] YouTube API: quotaの残っているキーがありません（{self.accountant.summary(self.api_keys)}）")
+                return None
+            tried.add(api_key)
+            headers = {"If-None-Match": etag} if etag else {}
+            resp = self.session.get(
+                f"{API_BASE}/{endpoint}",
+                params={**params, "key": api_key},
+                headers=headers,
+                timeout=(5, 10),
+            )  # (connect, read) タイムアウト
+            # 304でもquotaは消費される前提で数える（推定値は多めに見積もる）
+            self.accountant.spend(api_key, cost)
+            if resp.status_code == 403:
+                reason = ""
+                try:
+                    reason = resp.json()["error"]["errors"][0]["reason"]
+                except (ValueError, KeyError, IndexError, TypeError):
+                    pass
+                if reason in QUOTA_EXCEEDED_REASONS:
+                    self.accountant.mark_exhausted(api_key)
+                print(f"  [WARN] APIキー制限（{endpoint}: {reason or 'forbidden'}）→ 別キーで再試行")
+                continue
+            if resp.status_code == 304:
+                return 304, None, etag
+            if resp.status_code != 200:
+                print(f"  [WARN] YouTube API {endpoint} HTTP {resp.status_code}")
+                return resp.status_code, None, None
+            return 200, resp.json(), resp.headers.get("ETag")
+
+    def search(self, **params):
+        """Search APIの結果（items）を返す（同じパラメータはキャッシュから返す）"""
+        cache_key = "&".join(f"{k}={params[k]}" for k in sorted(params))
+        with self.cache.lock:
+            cached = self.cache.data["search"].get(cache_key)
+        if cached and time.time() - cached["fetched_at"] < CACHE_TTL["search"]:
+            print(f"  [CACHE] Search API: {params.get('q', '')}")
+            return cached["items"]
+
+        result = self._request("search", params, etag=cached.get("etag") if cached else None)
+        if result is None or result[0] not in (200, 304):
+            # quota切れ・エラー時は期限切れでもキャッシュがあれば使う
+            return cached["items"] if cached else []
+        status, data, etag = result
+        items = cached["items"] if status == 304 else data.get("items", [])
+        with self.cache.lock:
+            self.cache.data["search"][cache_key] = {"etag": etag, "fetched_at": time.time(), "items": items}
+            self.cache.save()
+        return items
+
+    def video_statistics(self, video_ids):
+        """Videos APIで統計情報を返す {動画ID: statistics}（TTL内の動画IDはAPIを呼ばない）"""
+        now = time.time()
+        stats = {}
+        missing = []
+        with self.cache.lock:
+            entries = self.cache.data["videos"]
+            for video_id in video_ids:
+                cached = entries.get(video_id)
+                if cached and now - cached["fetched_at"] < CACHE_TTL["videos"]:
+                    stats[video_id] = cached["statistics"]
+                else:
+                    missing.append(video_id)
+        if stats:
+            print(f"  [CACHE] Videos API: {len(stats)}件")
+
+        for i in range(0, len(missing), VIDEOS_BATCH_SIZE):
+            batch = missing[i : i + VIDEOS_BATCH_SIZE]
+            result = self._request("videos", {"part": "statistics", "id": ",".join(batch)})
+            if result is None or result[0] != 200:
+                continue
+            fetched = {item["id"]: item["statistics"] for item in result[1].get("items", [])}
+            stats.update(fetched)
+            with self.cache.lock:
+                entries = self.cache.data["videos"]
+                for video_id, statistics in fetched.items():
+                    entries[video_id] = {"fetched_at": now, "statistics": statistics}
+                self.cache.save()
+        return stats
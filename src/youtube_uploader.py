@@ -2,6 +2,7 @@ import os
 import time
 import json
 import base64
+import mimetypes
 from datetime import datetime
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -343,7 +344,9 @@ class YouTubeUploader:
             return None
 
         try:
-            media = MediaFileUpload(thumbnail_path, mimetype='image/png', resumable=True)
+            # 2MB以下の小さなファイルなので resumable ではなく1リクエストで送る
+            mimetype = mimetypes.guess_type(thumbnail_path)[0] or 'image/jpeg'
+            media = MediaFileUpload(thumbnail_path, mimetype=mimetype, resumable=False)
             request = self.youtube.thumbnails().set(
                 videoId=video_id,
                 media_body=media